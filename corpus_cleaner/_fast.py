@@ -0,0 +1,121 @@
+"""文字種カウントの高速化カーネル（NumPy・Numbaが利用可能な場合のみ使用）"""
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+try:
+    from numba import njit, types
+    NUMBA_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    NUMBA_AVAILABLE = False
+    njit = None
+    types = None
+
+
+def to_codepoints(text: str):
+    """文字列をUTF-32のコードポイント配列に変換"""
+    # 孤立サロゲートを含むテキストでも変換できるようにsurrogatepassを指定
+    return np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+
+
+def build_ascii_mask(chars: str):
+    """ASCII文字の集合を128要素の真偽値テーブルに変換"""
+    mask = np.zeros(128, dtype=np.bool_)
+    for char in chars:
+        mask[ord(char)] = True
+    return mask
+
+
+def count_japanese(codepoints):
+    """ひらがな・カタカナ・漢字の数をNumPyのベクトル演算で数える（Numbaがない場合の代替）"""
+    hiragana = np.count_nonzero((codepoints >= 0x3040) & (codepoints <= 0x309F))
+    katakana = np.count_nonzero((codepoints >= 0x30A0) & (codepoints <= 0x30FF))
+    kanji = np.count_nonzero((codepoints >= 0x4E00) & (codepoints <= 0x9FFF))
+    return int(hiragana), int(katakana), int(kanji)
+
+
+if NUMBA_AVAILABLE:
+    # cleaner._EMOJI_REの文字クラスを重なりのない区間にまとめたもの（開始位置, 区間の幅）
+    # 符号なし整数の減算は開始位置より小さい値で桁あふれするため、比較1回で区間判定できる
+    _EMOJI_RANGES = tuple((np.uint32(start), np.uint32(end - start)) for start, end in (
+        (0x24C2, 0x1F251),
+        (0x1F300, 0x1F64F),
+        (0x1F680, 0x1F6FF),
+        (0x1F900, 0x1FAFF),
+    ))
+    _R0, _R1, _R2, _R3 = _EMOJI_RANGES
+
+    @njit(inline='always')
+    def _is_emoji(cp):
+        """絵文字の範囲に含まれるかを分岐なしで判定"""
+        return (
+            ((cp - _R0[0]) <= _R0[1])
+            | ((cp - _R1[0]) <= _R1[1])
+            | ((cp - _R2[0]) <= _R2[1])
+            | ((cp - _R3[0]) <= _R3[1])
+        )
+
+    # 日本語文字の範囲（開始位置, 区間の幅）
+    _HIRAGANA = (np.uint32(0x3040), np.uint32(0x309F - 0x3040))  # ひらがな（U+3040-U+309F）
+    _KATAKANA = (np.uint32(0x30A0), np.uint32(0x30FF - 0x30A0))  # カタカナ（U+30A0-U+30FF）
+    _KANJI = (np.uint32(0x4E00), np.uint32(0x9FFF - 0x4E00))  # 漢字（CJK統合漢字 U+4E00-U+9FFF）
+
+    # 引数の型を固定して初回呼び出し時の型推論を省き、連続配列（[::1]）としてベクトル化しやすくする
+    # （bytesから作ったコードポイント配列は読み取り専用になる）
+    @njit(
+        types.UniTuple(types.int64, 5)(
+            types.Array(types.uint32, 1, 'C', readonly=True),
+            types.Array(types.boolean, 1, 'C'),
+        ),
+        cache=True,
+    )
+    def scan_counts(codepoints, ascii_mask):
+        """特殊記号・絵文字の連続・ひらがな・カタカナ・漢字の数を1回の走査で数える"""
+        special = 0
+        emoji = 0
+        hiragana = 0
+        katakana = 0
+        kanji = 0
+        # 各カウントは分岐なしの比較の和で求め、ループ間で状態を持ち越さない
+        # （絵文字は正規表現の[...]+のマッチ数に合わせ、直前の文字が絵文字でない位置を連続の先頭として数える）
+        for i in range(codepoints.shape[0]):
+            cp = codepoints[i]
+            is_emoji = _is_emoji(cp)
+            if i == 0:
+                emoji += is_emoji
+            else:
+                emoji += is_emoji & ~_is_emoji(codepoints[i - 1])
+            special += (cp < 128) & ascii_mask[cp & 127]
+            hiragana += (cp - _HIRAGANA[0]) <= _HIRAGANA[1]
+            katakana += (cp - _KATAKANA[0]) <= _KATAKANA[1]
+            kanji += (cp - _KANJI[0]) <= _KANJI[1]
+        return special, emoji, hiragana, katakana, kanji
+
+    # 罫線文字（cleaner._BOX_CHARS_1・_BOX_CHARS_2はいずれもこの区間に含まれる）
+    _BOX_DRAWING = (np.uint32(0x2500), np.uint32(0x257F - 0x2500))
+
+    @njit(
+        types.boolean(types.Array(types.uint32, 1, 'C', readonly=True), types.int64),
+        cache=True,
+    )
+    def has_broken_notation(codepoints, max_repeat_chars):
+        """上限を超える同じ文字の連続か罫線文字を含むか（含まなければ崩れた表記の正規化は何も変えない）"""
+        run = 0
+        previous = np.uint32(0)
+        for i in range(codepoints.shape[0]):
+            cp = codepoints[i]
+            if (cp - _BOX_DRAWING[0]) <= _BOX_DRAWING[1]:
+                return True
+            # 正規表現の(.)は改行にマッチしないので、改行の連続は数えない
+            if i > 0 and cp == previous and cp != 0x0A:
+                run += 1
+            else:
+                run = 1
+            if run > max_repeat_chars:
+                return True
+            previous = cp
+        return False
@@ -0,0 +1,109 @@
+"""重複検出用のブルームフィルタ"""
+
+import math
+from typing import List
+
+
+_MASK_64 = (1 << 64) - 1
+
+
+def _next_prime(n: int) -> int:
+    """n以上の最小の素数"""
+    if n <= 2:
+        return 2
+    candidate = n | 1
+    while True:
+        if all(candidate % divisor for divisor in range(3, math.isqrt(candidate) + 1, 2)):
+            return candidate
+        candidate += 2
+
+
+def _mix64(key: int) -> int:
+    """64bitのキーを別の64bitの値に攪拌（SplitMix64の最終段）"""
+    z = (key + 0x9E3779B97F4A7C15) & _MASK_64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return z ^ (z >> 31)
+
+
+class _BloomSlice:
+    """固定容量のブルームフィルタ"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        # 容量と偽陽性率から最適なビット数とハッシュ数を決める
+        # ビット数を素数にし、増分がビット数と互いに素になるようにする（公約数があると位置が周期的に重なる）
+        self.num_bits = _next_prime(max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: int):
+        """64bitのキーから三重ハッシュ法でビット位置を列挙"""
+        num_bits = self.num_bits
+        # キーと、キーを1回・2回攪拌した値の3つの64bitの値から、位置・増分・増分の増分を作る
+        # （2つの値だけでは、未登録のキーが登録済みのキーと両方の値で一致する確率が
+        # 登録数/ビット数^2 程度あり、小さいフィルタで偽陽性率の下限になる）
+        mixed = _mix64(key)
+        position = key % num_bits
+        step = mixed % num_bits
+        step_delta = _mix64(mixed) % num_bits
+        for _ in range(self.num_hashes):
+            yield position
+            position = (position + step) % num_bits
+            step = (step + step_delta) % num_bits
+
+    def __contains__(self, key: int) -> bool:
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, key: int):
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+class BloomFilter:
+    """
+    64bitの整数キーを保持するスケーラブルなブルームフィルタ
+
+    偽陽性（未登録のキーを登録済みと判定する）がerror_rate程度の確率で起こるため、
+    重複検出に使うと重複していない文書がまれに除外される。
+    登録数がinitial_capacityを超えると、容量を倍にしたフィルタを追加して偽陽性率を保つ。
+    """
+
+    # 追加するフィルタごとに偽陽性率を絞る割合（全体の偽陽性率がerror_rateを超えないようにする）
+    _TIGHTENING_RATIO = 0.5
+
+    def __init__(self, initial_capacity: int, error_rate: float):
+        if initial_capacity <= 0:
+            raise ValueError("initial_capacityは正の整数である必要があります")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rateは0より大きく1より小さい必要があります")
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self._slices: List[_BloomSlice] = [
+            _BloomSlice(initial_capacity, error_rate * (1 - self._TIGHTENING_RATIO))
+        ]
+
+    def __contains__(self, key: int) -> bool:
+        return any(key in bloom_slice for bloom_slice in self._slices)
+
+    def __len__(self) -> int:
+        return sum(bloom_slice.count for bloom_slice in self._slices)
+
+    def add(self, key: int):
+        current = self._slices[-1]
+        if current.count >= current.capacity:
+            # j番目のフィルタの偽陽性率をerror_rate * (1 - r) * r^jとし、合計がerror_rateに収まるようにする
+            error_rate = (
+                self.error_rate * (1 - self._TIGHTENING_RATIO)
+                * self._TIGHTENING_RATIO ** len(self._slices)
+            )
+            current = _BloomSlice(current.capacity * 2, error_rate)
+            self._slices.append(current)
+        current.add(key)
@@ -1,44 +1,300 @@
 """クリーニング処理のメインロジック"""
 
+import dataclasses
+import hashlib
+import html
+import os
 import re
 import unicodedata
-import warnings
-from typing import Dict, Any, Optional, Set
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate, islice, product
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set, Union
 from html.parser import HTMLParser
-from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
-from collections import defaultdict
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 
-warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+from . import _fast
+from .config import CleanerConfig
+from .bloom import BloomFilter
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    ahocorasick = None
+
+try:
+    from datasketch import MinHash, MinHashLSH
+    DATASKETCH_AVAILABLE = True
+except ImportError:
+    DATASKETCH_AVAILABLE = False
+    MinHash = None
+    MinHashLSH = None
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+    xxhash = None
+
+# 特殊記号の定義（日本語テキストに通常含まれない記号）
+_SPECIAL_CHARS = '!@#$%^&*()_+-=[]{}|;:,.<>?/~`'
+# 特殊記号を削除する変換テーブル（削除前後の長さの差で個数を数える）
+_SPECIAL_CHARS_DELETE_TABLE = str.maketrans('', '', _SPECIAL_CHARS)
+# Numbaカーネル用の特殊記号テーブル
+_SPECIAL_CHARS_MASK = _fast.build_ascii_mask(_SPECIAL_CHARS) if _fast.NUMBA_AVAILABLE else None
+# Numbaがない場合にNumPyで日本語文字を数えるテキスト長の下限
+_NUMPY_MIN_LENGTH = 128
+
+# 日本語文字の文字種を目印の文字に置き換える変換テーブル（Numbaがない場合の代替）
+# 漢字の範囲の終端（U+9FFF）までの各コードポイントに対応するリストで、文字種に含まれない文字はNoneで削除する
+# （リストの範囲外のコードポイントは変換されずに残るが、目印の文字と重なることはない）
+_HIRAGANA_TAG = '\x01'
+_KATAKANA_TAG = '\x02'
+_KANJI_TAG = '\x03'
+_JAPANESE_TAG_TABLE: List[Optional[str]] = [None] * 0xA000
+_JAPANESE_TAG_TABLE[0x3040:0x30A0] = [_HIRAGANA_TAG] * (0x30A0 - 0x3040)  # ひらがな（U+3040-U+309F）
+_JAPANESE_TAG_TABLE[0x30A0:0x3100] = [_KATAKANA_TAG] * (0x3100 - 0x30A0)  # カタカナ（U+30A0-U+30FF）
+_JAPANESE_TAG_TABLE[0x4E00:0xA000] = [_KANJI_TAG] * (0xA000 - 0x4E00)  # 漢字（CJK統合漢字 U+4E00-U+9FFF）
+
+
+def _build_literal_matcher(literals):
+    """固定文字列の集合をテキスト1回の走査で検索するマッチャーを構築"""
+    if AHOCORASICK_AVAILABLE:
+        automaton = ahocorasick.Automaton()
+        for literal in literals:
+            automaton.add_word(literal, literal)
+        automaton.make_automaton()
+        return automaton
+    # pyahocorasickがない場合は固定文字列の選択を正規表現で代用する
+    return re.compile('|'.join(re.escape(literal) for literal in literals))
+
+
+def _compile_broken_notation_passes(max_repeat_chars: int) -> List[tuple]:
+    """崩れた表記の正規化に使う(正規表現, 置換文字列)の列を構築"""
+    repeat_re = re.compile(r'(.)\1{' + str(max_repeat_chars) + r',}')
+    repeat_repl = r'\1' * max_repeat_chars
+    if max_repeat_chars < 3:
+        # 繰り返しの制限で罫線の並びが3文字未満に縮むため、繰り返しの制限を先に別の走査で適用する
+        return [(repeat_re, repeat_repl), (_ASCII_ART_RE, '')]
+    # 上限が3以上なら罫線の並びは制限後も除去対象のままなので、罫線の除去を優先した1回の走査にまとめる
+    # 罫線の選択肢にマッチした場合はグループ1が空になり、置換結果は空文字列になる
+    fused_re = re.compile(_ASCII_ART_RE.pattern + '|' + repeat_re.pattern)
+    return [(fused_re, repeat_repl)]
+
+
+def _iter_literals(matcher, text: str):
+    """マッチした固定文字列を(開始位置, 終了位置, 文字列)として列挙"""
+    if AHOCORASICK_AVAILABLE:
+        for end, literal in matcher.iter(text):
+            yield end - len(literal) + 1, end + 1, literal
+    else:
+        for match in matcher.finditer(text):
+            yield match.start(), match.end(), match.group()
+
+
+# コードらしいパターン（固定文字列はAho-Corasickで別に検索する）
+_CODE_PATTERNS = (
+    r'def\s+\w+\s*\(',  # 関数定義
+    r'class\s+\w+',  # クラス定義
+    r'import\s+\w+',  # import文
+    r'#include\s*<',  # C/C++ include
+    r'function\s+\w+\s*\(',  # JavaScript関数
+    r'const\s+\w+\s*=',  # const宣言
+    r'let\s+\w+\s*=',  # let宣言
+    r'var\s+\w+\s*=',  # var宣言
+)
+# 全パターンを1つの選択に結合し、テキストを1回の走査で検査する
+# 先頭の先読みで各パターンの最初の1文字の候補を示し、候補以外の位置では選択肢を試さずに読み飛ばす
+_CODE_RE = re.compile(
+    '(?=[cdfilv#])(?:' + '|'.join(f'(?:{pattern})' for pattern in _CODE_PATTERNS) + ')',
+    re.IGNORECASE | re.MULTILINE
+)
+# コードらしい固定文字列（大文字小文字を区別しないため<?phpは全表記を登録する）
+_CODE_LITERALS = (
+    *('<?' + ''.join(chars) for chars in product('pP', 'hH', 'pP')),  # PHP
+    '<?=',  # PHP短縮タグ
+    '```',  # コードブロック（言語指定付きも含む）
+)
+_CODE_LITERAL_MATCHER = _build_literal_matcher(_CODE_LITERALS)
+
+# ログパターン
+# ログらしいパターン（マッチした名前付きグループの種類数で判定する）
+# 先頭の先読みで最初の1文字の候補を示し、候補以外の位置では各選択肢を試さずに読み飛ばす
+_LOG_RE = re.compile(
+    r'(?=[\d\[ET])(?:'
+    r'(?P<timestamp>\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})'  # タイムスタンプ
+    r'|(?P<level>\[(?:DEBUG|INFO|WARN|ERROR|FATAL)\])'  # ログレベル
+    r'|(?P<error>ERROR:)'  # エラーメッセージ
+    r'|(?P<exception>Exception:)'  # 例外
+    r'|(?P<traceback>Traceback\s+\(most recent call last\))'  # Python traceback
+    r')'
+)
+
+# 絵文字の検出（Unicode絵文字の範囲）
+_EMOJI_RE = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
+    "\U0001FA00-\U0001FA6F"  # Chess Symbols
+    "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
+    "]+",
+    flags=re.UNICODE
+)
+# 上記の範囲に含まれる最小の文字
+_EMOJI_MIN_CHAR = '\U000024C2'
+
+# 全角英数字（Ａ-Ｚ、ａ-ｚ、０-９）と全角スペースを半角に変換するテーブル
+_FULLWIDTH_TO_HALFWIDTH_TABLE = str.maketrans(
+    'ＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺ'
+    'ａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚ'
+    '０１２３４５６７８９'
+    '　',
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    'abcdefghijklmnopqrstuvwxyz'
+    '0123456789'
+    ' '
+)
+
+# HTMLの開始タグの先頭（「<」の直後がタグ名の先頭文字のときだけ要素になる）
+_TAG_OPEN_RE = re.compile(r'<[A-Za-z_:.]')
+# HTMLのタグ（コメント・宣言・処理命令は要素を作らないので読み飛ばすだけ）
+# グループ1は終了タグの「/」、グループ2はタグ名
+_TAG_RE = re.compile(r'<!--.*?(?:-->|\Z)|<[!?][^>]*>?|<(/?)([A-Za-z_:.][^\s/>]*)[^>]*>?', re.S)
+# 終了タグを持たない空要素
+_VOID_ELEMENTS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+))
+# 開始すると開いているp要素を暗黙に閉じる要素
+_P_CLOSING_ELEMENTS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'div', 'dl', 'fieldset', 'footer', 'form',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'ul', 'xmp',
+))
+# 中身をタグとして解釈せず、対応する終了タグまでをそのままテキストとする要素（文字参照も展開しない）
+_RAW_TEXT_ELEMENTS = frozenset(('iframe', 'noembed', 'noframes', 'script', 'style', 'xmp'))
+# 中身をタグとして解釈しないが、文字参照は展開する要素
+_ESCAPABLE_RAW_TEXT_ELEMENTS = frozenset(('textarea', 'title'))
+# 終了タグを持たず、以降のテキストをすべてそのままテキストとする要素
+_PLAINTEXT_ELEMENT = 'plaintext'
+# 中のテキストを別の種類の文字列として持つ要素（BeautifulSoupのget_text()は、その文字列を
+# 同じ名前の要素でだけ数え、外側の要素では数えない）
+_STRING_CONTAINER_ELEMENTS = frozenset(('rp', 'rt', 'script', 'style', 'template'))
+
+# 文末記号（文分割では「。」にそろえてからstr.splitで分割する）
+_SENTENCE_END = '。'
+_OTHER_SENTENCE_ENDS = ('！', '？')
+
+# アスキーアートの簡易検出パターン
+# 装飾的な文字パターン（連続する特殊文字や記号）
+_BOX_CHARS_1 = '─━│┃┄┅┆┇┈┉┊┋┌┍┎┏┐┑┒┓└┕┖┗┘┙┚┛├┝┞┟┠┡┢┣┤┥┦┧┨┩┪┫┬┭┮┯┰┱┲┳┴┵┶┷┸┹┺┻┼┽┾┿╀╁╂╃╄╅╆╇╈╉╊╋╌╍╎╏'  # 罫線文字
+_BOX_CHARS_2 = '═║╒╓╔╕╖╗╘╙╚╛╜╝╞╟╠╡╢╣╤╥╦╧╨╩╪╫╬'  # 罫線文字2
+# 罫線文字の3文字以上の並び、罫線文字2の3文字以上の並びの順に除去した場合と同じ結果になるよう1つにまとめたもの
+# 罫線文字2の並びは、間に挟まる罫線文字の並び（先に除去されて前後がつながる）ごと除去する
+# （間の並びは後ろに罫線文字が続かない最長の並びだけにマッチさせる。量指定子を入れ子にして並びの
+# 分け方を複数許すと、罫線文字2が3つ続かない場合に分け方の組み合わせをすべて試して指数時間かかる）
+_ASCII_ART_RE = re.compile(
+    r'(?:[' + _BOX_CHARS_2 + r'](?:[' + _BOX_CHARS_1 + r']{3,}(?![' + _BOX_CHARS_1 + r']))?){3,}'
+    r'|[' + _BOX_CHARS_1 + r']{3,}'
+)
+# （以下の改行系パターンはリテラルの改行から始めることで、正規表現エンジンの前方一致探索を効かせる）
+# CRLFまたは単独のCR
+_CARRIAGE_RETURN_RE = re.compile(r'\r\n?')
+_BLANK_LINES_RE = re.compile(r'\n\n+')
+# 前の行に連結する改行（前の行が文末記号で終わらず、次の行が空行でも見出しでもない）
+_LINE_JOIN_RE = re.compile(r'\n(?<=[^。、！？\n]\n)(?=[^\n])(?!#{1,6}[^\S\n])')
+
+
+def _html_text_weight(open_elements: List[str]) -> int:
+    """開いている要素の並びのもとで、テキストをget_text()で数える要素の数"""
+    # テキストの種類は最も内側の文字列コンテナ要素で決まり、同じ名前の要素だけがそれを数える
+    for name in reversed(open_elements):
+        if name in _STRING_CONTAINER_ELEMENTS:
+            return open_elements.count(name)
+    return len(open_elements)
+
+
+@lru_cache(maxsize=None)
+def _raw_text_end_re(name: str):
+    """中身をタグとして解釈しない要素の終了タグ（タグ名の直後が空白・「/」・「>」のもの）"""
+    return re.compile(r'</' + name + r'[\t\n\f\r />]', re.I)
+
+
+# specialize()で生成する_filter_reasonで各品質チェックを呼び出す式（filter_orderの名前ごと）
+_FILTER_CALLS = {
+    'japanese_character_ratio': 'check_japanese_character_ratio(text, counts)',
+    'sentence_structure': 'check_sentence_structure(text)',
+    'impurity': 'check_impurities(text, counts)',
+}
 
 class CorpusCleaner:
     """コーパスクリーナークラス"""
     
-    def __init__(self, config: Optional[Dict[str, Any]] = None):
+    def __init__(self, config: Union[CleanerConfig, Dict[str, Any], None] = None):
         """
         Args:
-            config: クリーニング設定
+            config: クリーニング設定（辞書の場合は指定のない項目に既定値を使う）
         """
-        self.config = config or {}
-        
-        # 設定のデフォルト値
-        self.min_length = self.config.get('min_length', 10)
-        self.max_length = self.config.get('max_length', 10000)
-        self.max_special_char_ratio = self.config.get('max_special_char_ratio', 0.3)
-        self.max_code_ratio = self.config.get('max_code_ratio', 0.2)
-        self.max_html_ratio = self.config.get('max_html_ratio', 0.2)
-        self.max_emoji_ratio = self.config.get('max_emoji_ratio', 0.1)
-        self.max_repeat_chars = self.config.get('max_repeat_chars', 3)
-        self.max_sentence_length = self.config.get('max_sentence_length', 500)
-        self.require_sentence_end = self.config.get('require_sentence_end', True)
-        self.min_sentence_end_ratio = self.config.get('min_sentence_end_ratio', 0.7)
-        self.min_hiragana_ratio = self.config.get('min_hiragana_ratio', 0.3)
-        self.max_hiragana_ratio = self.config.get('max_hiragana_ratio', 0.8)
-        self.min_kanji_ratio = self.config.get('min_kanji_ratio', 0.1)
-        self.max_kanji_ratio = self.config.get('max_kanji_ratio', 0.5)
-        
-        self.seen_texts: Set[str] = set()
-        self.stats = defaultdict(int)
+        if not isinstance(config, CleanerConfig):
+            config = CleanerConfig.from_dict(config or {})
+        self.config = config
+        
+        # 1文書ごとに参照する閾値はインスタンス属性に展開しておく
+        self.min_length = self.config.min_length
+        self.max_length = self.config.max_length
+        self.max_special_char_ratio = self.config.max_special_char_ratio
+        self.max_code_ratio = self.config.max_code_ratio
+        self.max_html_ratio = self.config.max_html_ratio
+        self.max_emoji_ratio = self.config.max_emoji_ratio
+        self.max_repeat_chars = self.config.max_repeat_chars
+        self.max_sentence_length = self.config.max_sentence_length
+        self.require_sentence_end = self.config.require_sentence_end
+        self.min_sentence_end_ratio = self.config.min_sentence_end_ratio
+        self.min_hiragana_ratio = self.config.min_hiragana_ratio
+        self.max_hiragana_ratio = self.config.max_hiragana_ratio
+        self.min_kanji_ratio = self.config.min_kanji_ratio
+        self.max_kanji_ratio = self.config.max_kanji_ratio
+        self.near_duplicate_detection = self.config.near_duplicate_detection
+        self.near_duplicate_threshold = self.config.near_duplicate_threshold
+        self.near_duplicate_num_perm = self.config.near_duplicate_num_perm
+        self.shingle_size = self.config.shingle_size
+        self.duplicate_fpr = self.config.duplicate_fpr
+        self.expected_docs = self.config.expected_docs
+        self.filter_order = self.config.filter_order
+        
+        # 正規化済みテキストそのものではなく64bitのダイジェストを整数として保持する
+        # duplicate_fprを指定した場合はブルームフィルタを使い、メモリを大きく減らす代わりに
+        # その確率で重複していない文書も重複として除外される
+        self.seen_hashes: Union[Set[int], BloomFilter]
+        if self.duplicate_fpr:
+            self.seen_hashes = BloomFilter(self.expected_docs, self.duplicate_fpr)
+        else:
+            self.seen_hashes = set()
+        
+        # 崩れた表記の正規化に使う正規表現（上限が3以上なら1回の走査にまとまる）
+        self._broken_notation_passes = _compile_broken_notation_passes(self.max_repeat_chars)
+        
+        # MinHash LSHによる近似重複検出（datasketchが必要）
+        self._lsh = None
+        self._lsh_doc_id = 0
+        if self.near_duplicate_detection:
+            if DATASKETCH_AVAILABLE:
+                self._lsh = MinHashLSH(
+                    threshold=self.near_duplicate_threshold,
+                    num_perm=self.near_duplicate_num_perm
+                )
+            else:
+                print("警告: datasketchがインストールされていないため、近似重複検出はスキップされます。")
+        self.stats = Counter()
     
     def clean(self, entry: Dict[str, Any], text_field: str = 'text') -> Optional[Dict[str, Any]]:
         """
@@ -64,20 +320,156 @@ class CorpusCleaner:
             self.stats['length_filtered'] += 1
             return None
         
-        if not self._check_duplicate(text):
-            self.stats['duplicate_filtered'] += 1
-            return None
+        return self._clean_text(entry, text, text_field)
+    
+    def clean_batch(
+        self,
+        entries: List[Dict[str, Any]],
+        text_field: str = 'text'
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        複数のエントリをまとめてクリーニング
         
-        if not self._check_impurities(text):
-            self.stats['impurity_filtered'] += 1
-            return None
+        フィールド・型・長さの安価な判定をバッチ全体に一括で適用し、
+        残ったエントリだけを入力順に個別のチェックへ回す。
+        結果と統計情報はエントリごとにclean()を呼んだ場合と同じになる。
+        
+        Args:
+            entries: JSONLエントリのリスト
+            text_field: テキストが格納されているフィールド名
+            
+        Returns:
+            各エントリに対応するクリーニング済みエントリ（除外された場合はNone）のリスト
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(entries)
+        missing_count = 0
+        invalid_count = 0
+        length_filtered_count = 0
+        candidates = []
+        
+        min_length = self.min_length
+        max_length = self.max_length
+        for i, entry in enumerate(entries):
+            if text_field not in entry:
+                missing_count += 1
+                continue
+            text = entry[text_field]
+            if not isinstance(text, str):
+                invalid_count += 1
+            elif min_length <= len(text) <= max_length:
+                candidates.append((i, text))
+            else:
+                length_filtered_count += 1
         
-        if not self._check_sentence_structure(text):
-            self.stats['sentence_structure_filtered'] += 1
+        for key, count in (
+            ('missing_text_field', missing_count),
+            ('invalid_text_type', invalid_count),
+            ('length_filtered', length_filtered_count),
+        ):
+            if count:
+                self.stats[key] += count
+        
+        clean_text = self._clean_text
+        for i, text in candidates:
+            results[i] = clean_text(entries[i], text, text_field)
+        
+        return results
+    
+    def clean_parallel(
+        self,
+        entries: Iterable[Dict[str, Any]],
+        text_field: str = 'text',
+        workers: Optional[int] = None,
+        chunksize: int = 1024
+    ) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        複数プロセスでエントリをクリーニング
+        
+        重複チェック以外のチェックと正規化をワーカープロセスで並列に行い、
+        重複チェックだけをこのプロセスで入力順に行う。
+        結果と統計情報はエントリごとにclean()を呼んだ場合と同じになる。
+        
+        Args:
+            entries: JSONLエントリのイテラブル
+            text_field: テキストが格納されているフィールド名
+            workers: ワーカープロセス数（Noneの場合はCPU数）
+            chunksize: 1回にワーカーへ渡すエントリ数
+            
+        Yields:
+            入力順のクリーニング済みエントリ、または除外された場合はNone
+        """
+        workers = workers or os.cpu_count() or 1
+        
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self.config,)
+        ) as executor:
+            # 入力全体を一度に投入しないよう、処理中のチャンク数を制限する
+            pending = deque()
+            for chunk in _chunked(entries, chunksize):
+                pending.append(executor.submit(_clean_chunk, chunk, text_field))
+                if len(pending) >= workers * 2:
+                    yield from self._reduce_chunk(pending.popleft().result())
+            
+            while pending:
+                yield from self._reduce_chunk(pending.popleft().result())
+    
+    def _reduce_chunk(self, chunk) -> List[Optional[Dict[str, Any]]]:
+        """ワーカーの処理結果に入力順で重複チェックを適用し、統計情報を集計"""
+        results, reasons = chunk
+        # ワーカーが数えた除外理由のうち、重複と判定されたものだけを付け替えてからまとめて加算する
+        duplicates = Counter()
+        entries = []
+        for entry, signature, reason in results:
+            # 長さチェックまでに除外されたものは重複チェックの対象外
+            if signature is not None and not self._register_signature(*signature):
+                duplicates[reason] += 1
+                entry = None
+            entries.append(entry)
+        
+        if duplicates:
+            reasons.subtract(duplicates)
+            reasons['duplicate_filtered'] += duplicates.total()
+        self.stats += reasons
+        return entries
+    
+    def _clean_without_duplicate(self, entry: Dict[str, Any], text_field: str):
+        """
+        重複チェック以外のクリーニングを行う
+        
+        Returns:
+            (クリーニング済みエントリまたはNone, 重複判定用の署名, 統計情報のキー)
+        """
+        if text_field not in entry:
+            return None, None, 'missing_text_field'
+        
+        text = entry[text_field]
+        if not isinstance(text, str):
+            return None, None, 'invalid_text_type'
+        
+        if not self._check_length(text):
+            return None, None, 'length_filtered'
+        
+        # 逐次処理と同様に、他のチェックで除外されるテキストも重複判定に登録する
+        signature = self._duplicate_signature(text)
+        
+        reason = self._filter_reason(text)
+        if reason is not None:
+            return None, signature, reason
+        
+        entry[text_field] = self._normalize_text(text)
+        return entry, signature, 'kept'
+    
+    def _clean_text(self, entry: Dict[str, Any], text: str, text_field: str) -> Optional[Dict[str, Any]]:
+        """長さチェックを通過したテキストに残りのチェックと正規化を適用"""
+        if not self._check_duplicate(text):
+            self.stats['duplicate_filtered'] += 1
             return None
         
-        if not self._check_japanese_character_ratio(text):
-            self.stats['japanese_character_ratio_filtered'] += 1
+        reason = self._filter_reason(text)
+        if reason is not None:
+            self.stats[reason] += 1
             return None
         
         normalized_text = self._normalize_text(text)
@@ -85,6 +477,49 @@ class CorpusCleaner:
         self.stats['kept'] += 1
         return entry
     
+    def _filter_reason(self, text: str) -> Optional[str]:
+        """重複以外の品質チェックを行い、除外理由（統計情報のキー）を返す。通過した場合はNone"""
+        # 文字種ごとの文字数は1回の走査でまとめて数え、各チェックで共有する
+        counts = self._scan_counts(text)
+        
+        # filter_orderの順に行い、最初に該当したチェックを除外理由とする
+        for name in self.filter_order:
+            if name == 'japanese_character_ratio':
+                passed = self._check_japanese_character_ratio(text, counts)
+            elif name == 'sentence_structure':
+                passed = self._check_sentence_structure(text)
+            else:
+                passed = self._check_impurities(text, counts)
+            if not passed:
+                return f'{name}_filtered'
+        
+        return None
+    
+    def specialize(self) -> None:
+        """
+        filter_orderを展開した_filter_reasonを生成し、このインスタンスのメソッドと置き換える
+        
+        チェックの順序と除外理由の文字列は実行中に変わらないため、順序のループと名前による分岐、
+        除外理由の文字列の組み立てを文書ごとに行わずに済む。結果は置き換える前と同じになる。
+        """
+        lines = [
+            'def _filter_reason(text):',
+            '    counts = scan_counts(text)',
+        ]
+        for name in self.filter_order:
+            lines.append(f'    if not {_FILTER_CALLS[name]}:')
+            lines.append(f'        return {name + "_filtered"!r}')
+        lines.append('    return None')
+        
+        namespace = {
+            'scan_counts': self._scan_counts,
+            'check_japanese_character_ratio': self._check_japanese_character_ratio,
+            'check_sentence_structure': self._check_sentence_structure,
+            'check_impurities': self._check_impurities,
+        }
+        exec(compile('\n'.join(lines), '<specialized>', 'exec'), namespace)
+        self._filter_reason = namespace['_filter_reason']
+    
     def _check_length(self, text: str) -> bool:
         """長さチェック"""
         length = len(text)
@@ -96,151 +531,264 @@ class CorpusCleaner:
     
     def _check_duplicate(self, text: str) -> bool:
         """重複チェック"""
-        # 正規化（空白を統一）
-        normalized = re.sub(r'\s+', ' ', text.strip())
+        normalized, digest = self._duplicate_digest(text)
         
-        if normalized in self.seen_texts:
+        if digest in self.seen_hashes:
             return False
         
-        self.seen_texts.add(normalized)
+        # 完全一致しなかったものだけ近似重複を調べる（既出かどうかは上で調べたので再度は調べない）
+        minhash = self._build_minhash(normalized) if self._lsh is not None else None
+        return self._register_unseen(digest, minhash)
+    
+    def _duplicate_digest(self, text: str):
+        """空白を統一したテキストと、その64bitダイジェストを返す"""
+        # 空白文字の並びを1つの空白にまとめ、前後の空白を除去する
+        # （str.split()の区切りは正規表現の\s+と同じ空白文字の集合で、置換より速い）
+        normalized = ' '.join(text.split())
+        encoded = normalized.encode('utf-8')
+        # bytesより整数の方が1件あたりのメモリが小さい
+        if XXHASH_AVAILABLE:
+            digest = xxhash.xxh3_64_intdigest(encoded)
+        else:
+            digest = int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), 'little')
+        return normalized, digest
+    
+    def _duplicate_signature(self, text: str):
+        """重複判定用の署名（ダイジェスト, MinHash）を計算"""
+        normalized, digest = self._duplicate_digest(text)
+        minhash = self._build_minhash(normalized) if self._lsh is not None else None
+        return digest, minhash
+    
+    def _register_signature(self, digest: int, minhash) -> bool:
+        """署名が既出でなければ登録してTrue、重複ならFalseを返す"""
+        if digest in self.seen_hashes:
+            return False
+        return self._register_unseen(digest, minhash)
+    
+    def _register_unseen(self, digest: int, minhash) -> bool:
+        """完全一致しなかった署名を、近似重複でなければ登録してTrue、近似重複ならFalseを返す"""
+        if self._lsh is not None and minhash is not None:
+            if self._lsh.query(minhash):
+                return False
+            self._lsh.insert(str(self._lsh_doc_id), minhash)
+            self._lsh_doc_id += 1
+        
+        self.seen_hashes.add(digest)
         return True
     
-    def _check_impurities(self, text: str) -> bool:
+    def _build_minhash(self, text: str):
+        """文字n-gramのシングルからMinHashを作成"""
+        size = self.shingle_size
+        shingles = {text[i:i + size] for i in range(max(len(text) - size + 1, 1))}
+        
+        minhash = MinHash(num_perm=self.near_duplicate_num_perm)
+        minhash.update_batch([shingle.encode('utf-8') for shingle in shingles])
+        return minhash
+    
+    def _scan_counts(self, text: str) -> Optional[Dict[str, int]]:
+        """特殊記号・絵文字・ひらがな・カタカナ・漢字の文字数を1回の走査で数える（Numbaがない場合はNone）"""
+        if not _fast.NUMBA_AVAILABLE:
+            return None
+        special, emoji, hiragana, katakana, kanji = _fast.scan_counts(
+            _fast.to_codepoints(text), _SPECIAL_CHARS_MASK
+        )
+        return {
+            'special': special,
+            'emoji': emoji,
+            'hiragana': hiragana,
+            'katakana': katakana,
+            'kanji': kanji,
+        }
+    
+    def _check_impurities(self, text: str, counts: Optional[Dict[str, int]] = None) -> bool:
         """不純物チェック"""
-        # HTMLチェック
-        if self._check_html_ratio(text):
+        # 判定はいずれか1つでも該当すれば除外なので、安価なチェックから順に行い
+        # 高コストなHTMLのパースは他のチェックをすべて通過した場合にだけ行う
+        
+        if counts is None:
+            counts = self._scan_counts(text)
+        
+        # 特殊記号チェック
+        if self._check_special_char_ratio(text, counts):
             return False
         
-        # コードチェック
-        if self._check_code_ratio(text):
+        # 絵文字チェック
+        if self._check_emoji_ratio(text, counts):
             return False
         
         # ログチェック
         if self._check_log_pattern(text):
             return False
         
-        # 特殊記号チェック
-        if self._check_special_char_ratio(text):
+        # コードチェック（行の開始位置は1回だけ計算する）
+        if self._check_code_ratio(text, self._line_starts(text)):
             return False
         
-        # 絵文字チェック
-        if self._check_emoji_ratio(text):
+        # HTMLチェック
+        if self._check_html_ratio(text):
             return False
         
         return True
     
     def _check_html_ratio(self, text: str) -> bool:
         """HTMLタグが多すぎるかチェック"""
-        soup = BeautifulSoup(text, 'html.parser')
-        html_tags = soup.find_all()
+        # 開始タグになりうる並びがなければ要素は1つも作られないので、パースするまでもない
+        if not _TAG_OPEN_RE.search(text):
+            return False
         
-        if not html_tags:
+        html_text_length = self._html_text_length(text)
+        if html_text_length == 0:
             return False
         
-        # HTMLタグの文字数を計算
-        html_text_length = sum(len(tag.get_text()) for tag in html_tags)
         total_length = len(text)
-        
         if total_length == 0:
             return False
         
         html_ratio = html_text_length / total_length
         return html_ratio > self.max_html_ratio
     
-    def _check_code_ratio(self, text: str) -> bool:
-        """コードが多すぎるかチェック"""
-        # コードらしいパターンを検出
-        code_patterns = [
-            r'def\s+\w+\s*\(',  # 関数定義
-            r'class\s+\w+',  # クラス定義
-            r'import\s+\w+',  # import文
-            r'#include\s*<',  # C/C++ include
-            r'function\s+\w+\s*\(',  # JavaScript関数
-            r'const\s+\w+\s*=',  # const宣言
-            r'let\s+\w+\s*=',  # let宣言
-            r'var\s+\w+\s*=',  # var宣言
-            r'<\?php',  # PHP
-            r'<\?=',  # PHP短縮タグ
-            r'```',  # コードブロック
-            r'```\w+',  # 言語指定付きコードブロック
-        ]
+    def _html_text_length(self, text: str) -> int:
+        """
+        HTML要素の中にあるテキストの文字数を、要素ごとに数えた合計で返す
         
-        code_char_count = 0
+        入れ子の要素の中のテキストは、それを含む要素の数だけ重ねて数える
+        （各要素のテキスト長の合計で、lxmlでパースしたうえでget_text()を足し合わせた値に相当する）。
+        scriptやtextareaなどの中身はタグとして解釈せず、終了タグまでをテキストとして数える。
+        要素の暗黙の補完はpを閉じる場合だけを扱うため、入れ子の崩れたHTMLでは近似になる。
+        """
+        open_elements: List[str] = []
+        html_text_length = 0
+        position = 0
+        
+        while True:
+            match = _TAG_RE.search(text, position)
+            if match is None:
+                break
+            if open_elements and match.start() > position:
+                html_text_length += (
+                    self._html_segment_length(text[position:match.start()]) * _html_text_weight(open_elements)
+                )
+            position = match.end()
+            
+            name = match.group(2)
+            if name is None:
+                continue
+            name = name.lower()
+            
+            if match.group(1):
+                # 対応する開始タグまでの要素を閉じる（対応しない終了タグは無視する）
+                if name in open_elements:
+                    del open_elements[len(open_elements) - 1 - open_elements[::-1].index(name):]
+                continue
+            
+            if name in _P_CLOSING_ELEMENTS and 'p' in open_elements:
+                del open_elements[len(open_elements) - 1 - open_elements[::-1].index('p'):]
+            if name in _VOID_ELEMENTS or match.group(0).endswith('/>'):
+                continue
+            open_elements.append(name)
+            
+            if name == _PLAINTEXT_ELEMENT:
+                # 以降はすべてそのままのテキストになる
+                return html_text_length + (len(text) - position) * _html_text_weight(open_elements)
+            if name in _RAW_TEXT_ELEMENTS or name in _ESCAPABLE_RAW_TEXT_ELEMENTS:
+                # 中身は対応する終了タグまでタグとして解釈しない（終了タグがなければ末尾まで続く）
+                end_tag = _raw_text_end_re(name).search(text, position)
+                end = end_tag.start() if end_tag is not None else len(text)
+                segment = text[position:end]
+                segment_length = (
+                    self._html_segment_length(segment) if name in _ESCAPABLE_RAW_TEXT_ELEMENTS else len(segment)
+                )
+                html_text_length += segment_length * _html_text_weight(open_elements)
+                # 終了タグは次の走査で通常の終了タグとして閉じる
+                position = end
+        
+        # 閉じられていない要素はテキストの末尾まで続く
+        if open_elements and position < len(text):
+            html_text_length += self._html_segment_length(text[position:]) * _html_text_weight(open_elements)
+        
+        return html_text_length
+    
+    def _html_segment_length(self, segment: str) -> int:
+        """タグの間のテキストの文字数（文字参照は展開後の文字数で数える）"""
+        if '&' in segment:
+            return len(html.unescape(segment))
+        return len(segment)
+    
+    def _line_starts(self, text: str) -> List[int]:
+        """各行の開始位置のリスト（末尾はテキスト長+1の番兵で、行の長さは改行1文字分を含む）"""
+        return [0, *accumulate(len(line) + 1 for line in text.split('\n'))]
+    
+    def _check_code_ratio(self, text: str, line_starts: Optional[List[int]] = None) -> bool:
+        """コードが多すぎるかチェック"""
         total_length = len(text)
         
         if total_length == 0:
             return False
         
-        for pattern in code_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                # マッチした行の長さを加算（簡易的な実装）
-                line_start = text.rfind('\n', 0, match.start())
-                line_end = text.find('\n', match.end())
-                if line_end == -1:
-                    line_end = len(text)
-                code_char_count += (line_end - line_start)
+        if line_starts is None:
+            line_starts = self._line_starts(text)
+        
+        # マッチを含む行の集合（同じ行に複数マッチしても1回だけ数える）
+        code_lines: Set[int] = set()
+        
+        spans = [match.span() for match in _CODE_RE.finditer(text)]
+        spans.extend((start, end) for start, end, _ in _iter_literals(_CODE_LITERAL_MATCHER, text))
+        
+        for start, end in spans:
+            first_line = bisect_right(line_starts, start) - 1
+            last_line = bisect_right(line_starts, end - 1) - 1
+            code_lines.update(range(first_line, last_line + 1))
         
+        if not code_lines:
+            return False
+        
+        code_char_count = sum(line_starts[i + 1] - line_starts[i] for i in code_lines)
         code_ratio = code_char_count / total_length
         return code_ratio > self.max_code_ratio
     
     def _check_log_pattern(self, text: str) -> bool:
         """ログファイルらしいかチェック"""
-        # ログパターン
-        log_patterns = [
-            r'\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}',  # タイムスタンプ
-            r'\[(DEBUG|INFO|WARN|ERROR|FATAL)\]',  # ログレベル
-            r'ERROR:',  # エラーメッセージ
-            r'Exception:',  # 例外
-            r'Traceback\s+\(most recent call last\)',  # Python traceback
-        ]
-        
-        # パターンが多くマッチする場合はログと判断
-        match_count = sum(1 for pattern in log_patterns if re.search(pattern, text))
-        
-        # 3つ以上のパターンがマッチしたらログと判断
-        return match_count >= 3
+        # 1回の走査でマッチしたパターンの種類を集め、3種類以上に達した時点でログと判断する
+        matched_patterns = set()
+        for match in _LOG_RE.finditer(text):
+            matched_patterns.add(match.lastgroup)
+            if len(matched_patterns) >= 3:
+                return True
+        
+        return False
     
-    def _check_special_char_ratio(self, text: str) -> bool:
+    def _check_special_char_ratio(self, text: str, counts: Optional[Dict[str, int]] = None) -> bool:
         """特殊記号が多すぎるかチェック"""
         if not text:
             return False
         
-        # 特殊記号の定義（日本語テキストに通常含まれない記号）
-        special_chars = set('!@#$%^&*()_+-=[]{}|;:,.<>?/~`')
-        
-        special_count = sum(1 for char in text if char in special_chars)
         total_length = len(text)
+        if counts is None:
+            counts = self._scan_counts(text)
+        if counts is not None:
+            special_count = counts['special']
+        else:
+            # str.translateで特殊記号を削除し、減った文字数を特殊記号数とする
+            special_count = total_length - len(text.translate(_SPECIAL_CHARS_DELETE_TABLE))
         
         special_ratio = special_count / total_length
         return special_ratio > self.max_special_char_ratio
     
-    def _check_emoji_ratio(self, text: str) -> bool:
+    def _check_emoji_ratio(self, text: str, counts: Optional[Dict[str, int]] = None) -> bool:
         """絵文字が多すぎるかチェック"""
         if not text:
             return False
         
-        # 絵文字の検出（Unicode絵文字の範囲）
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # emoticons
-            "\U0001F300-\U0001F5FF"  # symbols & pictographs
-            "\U0001F680-\U0001F6FF"  # transport & map symbols
-            "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-            "\U00002702-\U000027B0"
-            "\U000024C2-\U0001F251"
-            "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
-            "\U0001FA00-\U0001FA6F"  # Chess Symbols
-            "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
-            "]+",
-            flags=re.UNICODE
-        )
-        
-        emoji_count = len(emoji_pattern.findall(text))
-        total_length = len(text)
-        
-        if total_length == 0:
+        if counts is None:
+            counts = self._scan_counts(text)
+        if counts is not None:
+            emoji_count = counts['emoji']
+        elif max(text) < _EMOJI_MIN_CHAR:
+            # 絵文字の範囲より小さいコードポイントしかなければ正規表現を走らせない
             return False
+        else:
+            emoji_count = len(_EMOJI_RE.findall(text))
+        total_length = len(text)
         
         emoji_ratio = emoji_count / total_length
         return emoji_ratio > self.max_emoji_ratio
@@ -248,70 +796,64 @@ class CorpusCleaner:
     def _check_sentence_structure(self, text: str) -> bool:
         """文分割の厳格化チェック"""
         # 文を分割（句点、感嘆符、疑問符で分割）
-        # 文末記号も含めて分割
-        sentence_parts = re.split(r'([。！？])', text)
-        
-        # 文と文末記号をペアにする
-        sentences = []
-        current_sentence = ""
-        for part in sentence_parts:
-            if part in '。！？':
-                if current_sentence.strip():
-                    sentences.append((current_sentence.strip(), part))
-                current_sentence = ""
-            else:
-                current_sentence += part
+        # 文末記号を1種類にそろえてstr.splitで分割する（正規表現での分割より速く、文末記号の文字列も作らない）
+        for end_mark in _OTHER_SENTENCE_ENDS:
+            text = text.replace(end_mark, _SENTENCE_END)
         
-        # 最後の文（文末記号がない可能性がある）
-        if current_sentence.strip():
-            sentences.append((current_sentence.strip(), ""))
+        # 文末記号を持たないのは最後の文だけなので、文ごとの組は作らず文の長さだけを並べる
+        sentence_texts = [part.strip() for part in text.split(_SENTENCE_END)]
+        sentence_lengths = [len(sentence_text) for sentence_text in sentence_texts if sentence_text]
         
-        if not sentences:
+        if not sentence_lengths:
             return False
         
         # 1. 異常に長い文の検出
-        for sentence_text, _ in sentences:
-            if len(sentence_text) > self.max_sentence_length:
-                return False
+        if max(sentence_lengths) > self.max_sentence_length:
+            return False
         
         # 2. 文の完結性チェック
         if self.require_sentence_end:
-            # 文末記号で終わっている文の数をカウント
-            completed_sentences = sum(1 for _, end_mark in sentences if end_mark)
-            total_sentences = len(sentences)
+            # 文末記号で終わっている文の数（最後の文が空でなければ、その文だけが文末記号を持たない）
+            total_sentences = len(sentence_lengths)
+            completed_sentences = total_sentences - (1 if sentence_texts[-1] else 0)
             
             # 文末記号の比率を計算
-            if total_sentences > 0:
-                end_ratio = completed_sentences / total_sentences
-                if end_ratio < self.min_sentence_end_ratio:
-                    return False
+            end_ratio = completed_sentences / total_sentences
+            if end_ratio < self.min_sentence_end_ratio:
+                return False
         
         return True
     
-    def _check_japanese_character_ratio(self, text: str) -> bool:
+    def _count_japanese_chars(self, text: str):
+        """ひらがな・カタカナ・漢字の文字数と、その合計を数える（Numbaがない場合の代替）"""
+        # 長いテキストはNumPyでまとめて数える（短いテキストは配列への変換の方が高くつく）
+        if _fast.NUMPY_AVAILABLE and len(text) > _NUMPY_MIN_LENGTH:
+            hiragana_count, katakana_count, kanji_count = _fast.count_japanese(_fast.to_codepoints(text))
+            return hiragana_count, katakana_count, kanji_count, hiragana_count + katakana_count + kanji_count
+        
+        # 文字種ごとの目印の文字に置き換え（それ以外の文字は削除）、目印の数を数える
+        tags = text.translate(_JAPANESE_TAG_TABLE)
+        hiragana_count = tags.count(_HIRAGANA_TAG)
+        katakana_count = tags.count(_KATAKANA_TAG)
+        kanji_count = tags.count(_KANJI_TAG)
+        total_japanese_chars = hiragana_count + katakana_count + kanji_count
+        
+        return hiragana_count, katakana_count, kanji_count, total_japanese_chars
+    
+    def _check_japanese_character_ratio(self, text: str, counts: Optional[Dict[str, int]] = None) -> bool:
         """ひらがな・カタカナ・漢字の比率チェック"""
         if not text:
             return False
         
-        # 日本語文字のカウント
-        hiragana_count = 0
-        katakana_count = 0
-        kanji_count = 0
-        total_japanese_chars = 0
-        
-        for char in text:
-            # ひらがな（U+3040-U+309F）
-            if '\u3040' <= char <= '\u309F':
-                hiragana_count += 1
-                total_japanese_chars += 1
-            # カタカナ（U+30A0-U+30FF）
-            elif '\u30A0' <= char <= '\u30FF':
-                katakana_count += 1
-                total_japanese_chars += 1
-            # 漢字（CJK統合漢字 U+4E00-U+9FFF）
-            elif '\u4E00' <= char <= '\u9FFF':
-                kanji_count += 1
-                total_japanese_chars += 1
+        if counts is None:
+            counts = self._scan_counts(text)
+        if counts is not None:
+            hiragana_count = counts['hiragana']
+            katakana_count = counts['katakana']
+            kanji_count = counts['kanji']
+            total_japanese_chars = hiragana_count + katakana_count + kanji_count
+        else:
+            hiragana_count, katakana_count, kanji_count, total_japanese_chars = self._count_japanese_chars(text)
         
         # 日本語文字が少なすぎる場合は除外
         if total_japanese_chars < 10:
@@ -359,85 +901,81 @@ class CorpusCleaner:
     
     def _convert_fullwidth_to_halfwidth(self, text: str) -> str:
         """全角英数字を半角に変換"""
-        # 全角英字（Ａ-Ｚ、ａ-ｚ）を半角に変換
-        text = text.translate(str.maketrans(
-            'ＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺ'
-            'ａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚ'
-            '０１２３４５６７８９',
-            'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-            'abcdefghijklmnopqrstuvwxyz'
-            '0123456789'
-        ))
-        
-        # 全角スペースを半角スペースに変換
-        text = text.replace('　', ' ')
-        
-        return text
+        return text.translate(_FULLWIDTH_TO_HALFWIDTH_TABLE)
     
     def _normalize_newlines(self, text: str) -> str:
         """改行の正規化"""
-        # CRLFをLFに統一
-        text = text.replace('\r\n', '\n')
-        text = text.replace('\r', '\n')
+        # CRLF・CRをLFに統一（CRを含まないテキストはそのまま）
+        if '\r' in text:
+            text = _CARRIAGE_RETURN_RE.sub('\n', text)
         
-        # 連続する改行を2つまでに制限（段落区切りとして保持）
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        # 改行を含まないテキストは前後の空白を除去するだけでよい
+        if '\n' not in text:
+            return text.strip()
+        
+        # 各行の前後の空白を除去（空白だけの行は空行になる）
+        text = '\n'.join([line.strip() for line in text.split('\n')])
+        
+        # 先頭の空行は除去し、末尾の空行は改行1つにまとめる
+        stripped = text.strip()
+        if not stripped:
+            return ''
+        # 各行は除去済みなので末尾の空白は改行だけで、末尾の判定にrstripのコピーは要らない
+        trailing_newline = '\n' if text.endswith('\n') else ''
+        
+        # 連続する空行を1つにまとめる（段落区切りとして保持）
+        text = _BLANK_LINES_RE.sub('\n\n', stripped)
         
         # 文の途中の改行を除去（簡易版）
         # 句点・読点・感嘆符・疑問符の後以外の改行をスペースに変換
-        # ただし、見出し記号（#、##など）の前後は保持
-        lines = text.split('\n')
-        normalized_lines = []
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                # 空行は保持（段落区切りとして）
-                if normalized_lines and normalized_lines[-1]:
-                    normalized_lines.append('')
-                continue
-            
-            # 見出し記号で始まる行は保持
-            if re.match(r'^#{1,6}\s+', line):
-                normalized_lines.append(line)
-                continue
-            
-            # 前の行が句点・読点・感嘆符・疑問符で終わっている場合は改行を保持
-            if normalized_lines and normalized_lines[-1]:
-                prev_line = normalized_lines[-1]
-                if re.search(r'[。、！？]$', prev_line):
-                    normalized_lines.append(line)
-                else:
-                    # 前の行に続ける（スペースで結合）
-                    normalized_lines[-1] = prev_line + ' ' + line
-            else:
-                normalized_lines.append(line)
+        # ただし、段落区切りと見出し記号（#、##など）で始まる行の前は保持
+        text = _LINE_JOIN_RE.sub(' ', text)
         
-        return '\n'.join(normalized_lines)
+        return text + trailing_newline
     
     def _normalize_broken_notation(self, text: str) -> str:
         """崩れた表記の正規化"""
         # 過剰な繰り返し文字の正規化（3回以上を制限）
         # 例: "wwww" -> "www", "！！！" -> "！！！"（3回まで）
-        text = re.sub(r'(.)\1{' + str(self.max_repeat_chars) + r',}', 
-                     r'\1' * self.max_repeat_chars, text)
-        
-        # アスキーアートの簡易検出と除去
-        # 装飾的な文字パターン（連続する特殊文字や記号）
-        ascii_art_patterns = [
-            r'[─━│┃┄┅┆┇┈┉┊┋┌┍┎┏┐┑┒┓└┕┖┗┘┙┚┛├┝┞┟┠┡┢┣┤┥┦┧┨┩┪┫┬┭┮┯┰┱┲┳┴┵┶┷┸┹┺┻┼┽┾┿╀╁╂╃╄╅╆╇╈╉╊╋╌╍╎╏]{3,}',  # 罫線文字
-            r'[═║╒╓╔╕╖╗╘╙╚╛╜╝╞╟╠╡╢╣╤╥╦╧╨╩╪╫╬]{3,}',  # 罫線文字2
-        ]
-        
-        for pattern in ascii_art_patterns:
-            text = re.sub(pattern, '', text)
-        
-        # 絵文字が多すぎる場合は除外（チェックは後で行う）
-        # ここでは正規化のみ
-        
+        # アスキーアートの簡易検出と除去も同じ走査で行う
+        # 正規表現は全位置で後方参照を試すため、置換対象がないテキストはNumbaの1回の走査で判定して省く
+        if _fast.NUMBA_AVAILABLE and not _fast.has_broken_notation(
+            _fast.to_codepoints(text), self.max_repeat_chars
+        ):
+            return text
+        for pattern, repl in self._broken_notation_passes:
+            text = pattern.sub(repl, text)
         return text
     
     def get_stats(self) -> Dict[str, int]:
         """統計情報を取得"""
         return dict(self.stats)
 
+
+# 並列処理で各ワーカープロセスが使うクリーナー
+_worker_cleaner: Optional[CorpusCleaner] = None
+
+
+def _init_worker(config: CleanerConfig):
+    """ワーカープロセスの初期化"""
+    global _worker_cleaner
+    # 重複の登録はメインプロセスで行うため、ワーカーではブルームフィルタを確保しない
+    _worker_cleaner = CorpusCleaner(dataclasses.replace(config, duplicate_fpr=None))
+    _worker_cleaner.specialize()
+
+
+def _clean_chunk(entries: List[Dict[str, Any]], text_field: str):
+    """ワーカープロセスでチャンクを処理し、各エントリの結果とチャンク内の統計情報を返す"""
+    cleaner = _worker_cleaner
+    results = [cleaner._clean_without_duplicate(entry, text_field) for entry in entries]
+    return results, Counter(reason for _, _, reason in results)
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    """イテラブルをsize件ずつのリストに分割"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,298 @@
+"""コマンドライン引数の定義"""
+
+import argparse
+import json
+from typing import Optional
+
+from .config import CleanerConfig
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数のパーサーを作成"""
+    parser = argparse.ArgumentParser(
+        prog='corpus_cleaner'
+    )
+    parser.add_argument(
+        'input',
+        type=str,
+        help='入力JSONLファイルのパス'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        type=str,
+        default=None,
+        help='出力JSONLファイルのパス（デフォルト: input_cleaned.jsonl）'
+    )
+    parser.add_argument(
+        '--text-field',
+        type=str,
+        default='content',
+        help='テキストが格納されているフィールド名（デフォルト: content）'
+    )
+    parser.add_argument(
+        '--stats-output',
+        type=str,
+        default=None,
+        help='統計情報を出力するJSONファイルのパス（デフォルト: statistics.json）'
+    )
+    parser.add_argument(
+        '--preset',
+        type=str,
+        default=None,
+        help='クリーニング設定を読み込むJSONファイルのパス（指定した場合、クリーニング設定の引数は無視される）'
+    )
+    parser.add_argument(
+        '--min-length',
+        type=int,
+        default=10,
+        help='最小文字数（デフォルト: 10）'
+    )
+    parser.add_argument(
+        '--max-length',
+        type=int,
+        default=10000,
+        help='最大文字数（デフォルト: 10000）'
+    )
+    parser.add_argument(
+        '--max-special-char-ratio',
+        type=float,
+        default=0.3,
+        help='特殊記号の最大比率（デフォルト: 0.3）'
+    )
+    parser.add_argument(
+        '--max-code-ratio',
+        type=float,
+        default=0.2,
+        help='コードの最大比率（デフォルト: 0.2）'
+    )
+    parser.add_argument(
+        '--max-html-ratio',
+        type=float,
+        default=0.2,
+        help='HTMLの最大比率（デフォルト: 0.2）'
+    )
+    parser.add_argument(
+        '--max-emoji-ratio',
+        type=float,
+        default=0.1,
+        help='絵文字の最大比率（デフォルト: 0.1）'
+    )
+    parser.add_argument(
+        '--max-repeat-chars',
+        type=int,
+        default=3,
+        help='繰り返し文字の最大回数（デフォルト: 3）'
+    )
+    parser.add_argument(
+        '--max-sentence-length',
+        type=int,
+        default=500,
+        help='1文の最大文字数（デフォルト: 500）'
+    )
+    parser.add_argument(
+        '--require-sentence-end',
+        action='store_true',
+        default=True,
+        help='文末記号（。！？）で終わることを要求（デフォルト: True）'
+    )
+    parser.add_argument(
+        '--no-require-sentence-end',
+        dest='require_sentence_end',
+        action='store_false',
+        help='文末記号の要求を無効化'
+    )
+    parser.add_argument(
+        '--min-sentence-end-ratio',
+        type=float,
+        default=0.7,
+        help='文末記号で終わる文の最小比率（デフォルト: 0.7）'
+    )
+    parser.add_argument(
+        '--min-hiragana-ratio',
+        type=float,
+        default=0.3,
+        help='ひらがなの最小比率（デフォルト: 0.3）'
+    )
+    parser.add_argument(
+        '--max-hiragana-ratio',
+        type=float,
+        default=0.8,
+        help='ひらがなの最大比率（デフォルト: 0.8）'
+    )
+    parser.add_argument(
+        '--min-kanji-ratio',
+        type=float,
+        default=0.1,
+        help='漢字の最小比率（デフォルト: 0.1）'
+    )
+    parser.add_argument(
+        '--max-kanji-ratio',
+        type=float,
+        default=0.5,
+        help='漢字の最大比率（デフォルト: 0.5）'
+    )
+    parser.add_argument(
+        '--near-duplicate-detection',
+        action='store_true',
+        default=False,
+        help='MinHash LSHによる近似重複検出を有効化（datasketchが必要）'
+    )
+    parser.add_argument(
+        '--near-duplicate-threshold',
+        type=float,
+        default=0.85,
+        help='近似重複とみなすJaccard類似度の閾値（デフォルト: 0.85）'
+    )
+    parser.add_argument(
+        '--near-duplicate-num-perm',
+        type=int,
+        default=128,
+        help='MinHashの置換数（デフォルト: 128、大きいほど高精度で低速）'
+    )
+    parser.add_argument(
+        '--shingle-size',
+        type=int,
+        default=5,
+        help='近似重複検出に使う文字n-gramの長さ（デフォルト: 5）'
+    )
+    parser.add_argument(
+        '--duplicate-fpr',
+        type=float,
+        default=None,
+        help='重複検出にブルームフィルタを使う場合の偽陽性率（例: 1e-6、未指定の場合は完全一致の集合を使用）'
+    )
+    parser.add_argument(
+        '--expected-docs',
+        type=int,
+        default=10_000_000,
+        help='ブルームフィルタの初期容量とする想定文書数（デフォルト: 10000000）'
+    )
+    parser.add_argument(
+        '--filter-order',
+        type=str,
+        nargs=3,
+        choices=['japanese_character_ratio', 'sentence_structure', 'impurity'],
+        default=['japanese_character_ratio', 'sentence_structure', 'impurity'],
+        help='品質チェックの実行順（3つすべてを指定、デフォルト: japanese_character_ratio sentence_structure impurity）。'
+             '最初に該当したチェックが除外理由として集計される'
+    )
+    parser.add_argument(
+        '--num-proc',
+        type=int,
+        default=1,
+        help='Phase 1のクリーニングに使うプロセス数（デフォルト: 1、重複チェックは入力順に行うため結果は変わらない）'
+    )
+    parser.add_argument(
+        '--staged',
+        action='store_true',
+        default=False,
+        help='フェーズごとに中間ファイル（*_phase1.jsonl、*_phase2.jsonl）へ書き出して処理（デバッグ用、デフォルトは1回の走査で全フェーズを処理）'
+    )
+    parser.add_argument(
+        '--keep-intermediates',
+        action='store_true',
+        default=False,
+        help='--stagedの場合に中間ファイルを削除せずに残す（デフォルトでは次のフェーズで読み終えた時点で削除）'
+    )
+    # Phase 2: KenLM設定
+    parser.add_argument(
+        '--kenlm-model',
+        type=str,
+        default=None,
+        help='KenLMモデルファイルのパス（Phase 2で使用、.bin形式、未指定の場合は自動検出を試みる）'
+    )
+    parser.add_argument(
+        '--sentencepiece-model',
+        type=str,
+        default=None,
+        help='SentencePieceモデルファイルのパス（.model形式、cc_netのja.sp.modelなど）'
+    )
+    parser.add_argument(
+        '--no-kenlm',
+        action='store_true',
+        default=False,
+        help='KenLM処理を無効化'
+    )
+    parser.add_argument(
+        '--no-kenlm-cache',
+        action='store_true',
+        default=False,
+        help='KenLMのperplexityのキャッシュを無効化（デフォルトでは同じテキストの再計算を省く）'
+    )
+    parser.add_argument(
+        '--max-kenlm-perplexity',
+        type=float,
+        default=15000.0,
+        help='KenLMの最大perplexity値（デフォルト: 15000.0）'
+    )
+    # Phase 3: LLM設定
+    parser.add_argument(
+        '--use-llm',
+        action='store_true',
+        default=None,
+        help='LLMによる最終評価を有効化（Phase 3、未指定の場合は自動検出）'
+    )
+    parser.add_argument(
+        '--no-llm',
+        action='store_true',
+        default=False,
+        help='LLM処理を無効化'
+    )
+    parser.add_argument(
+        '--llm-model',
+        type=str,
+        default='rinna/gemma-2-baku-2b',
+        help='LLMモデル名（デフォルト: rinna/gemma-2-baku-2b）'
+    )
+    parser.add_argument(
+        '--max-llm-perplexity',
+        type=float,
+        default=10.0,
+        help='LLMの最大perplexity値（デフォルト: 10.0、値が小さいほど厳格）'
+    )
+    parser.add_argument(
+        '--llm-batch-size',
+        type=int,
+        default=32,
+        help='LLMでまとめて評価するテキストの数（デフォルト: 32）'
+    )
+    parser.add_argument(
+        '--llm-quantization',
+        type=str,
+        choices=['8bit', '4bit'],
+        default=None,
+        help='LLMの重みをbitsandbytesで量子化（8bitまたは4bit、GPUが必要。perplexityの値が変わるため閾値の再調整が必要）'
+    )
+    parser.add_argument(
+        '--llm-cache',
+        type=str,
+        default=None,
+        help='LLMのperplexityをキャッシュするSQLiteファイルのパス（再実行時に同じテキストの計算を省略）'
+    )
+    parser.add_argument(
+        '--llm-compile',
+        action='store_true',
+        default=False,
+        help='LLMをtorch.compileでコンパイル（初回のバッチはコンパイルのため遅くなる）'
+    )
+    parser.add_argument(
+        '--no-auto-detect',
+        action='store_true',
+        default=False,
+        help='モデルの自動検出を無効化'
+    )
+    return parser
+
+
+def load_preset(path: str) -> CleanerConfig:
+    """JSONファイルからクリーニング設定を読み込む"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return CleanerConfig.from_dict(json.load(f))
+
+
+def config_from_args(args: argparse.Namespace) -> CleanerConfig:
+    """パース済みの引数からクリーニング設定を作成（--presetが指定されている場合はそのファイルから読み込む）"""
+    preset: Optional[str] = getattr(args, 'preset', None)
+    if preset is not None:
+        return load_preset(preset)
+    return CleanerConfig.from_dict(vars(args))
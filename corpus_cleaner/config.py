@@ -0,0 +1,51 @@
+"""クリーニング設定"""
+
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Tuple
+
+# 重複以外の品質チェックの既定の実行順（いずれか1つで除外されるので、安価で除外の多いものから行う）
+# 日本語文字の比率は文字種ごとの文字数が分かれば比較だけで済み、不純物はHTMLやコードの判定を含み最も高コスト
+_FILTER_NAMES = ('japanese_character_ratio', 'sentence_structure', 'impurity')
+
+
+@dataclass(frozen=True, slots=True)
+class CleanerConfig:
+    """
+    CorpusCleanerの設定
+
+    変更不可で__slots__を持つため、ワーカープロセスへは各フィールドの値だけが渡される。
+    """
+
+    min_length: int = 10
+    max_length: int = 10000
+    max_special_char_ratio: float = 0.3
+    max_code_ratio: float = 0.2
+    max_html_ratio: float = 0.2
+    max_emoji_ratio: float = 0.1
+    max_repeat_chars: int = 3
+    max_sentence_length: int = 500
+    require_sentence_end: bool = True
+    min_sentence_end_ratio: float = 0.7
+    min_hiragana_ratio: float = 0.3
+    max_hiragana_ratio: float = 0.8
+    min_kanji_ratio: float = 0.1
+    max_kanji_ratio: float = 0.5
+    near_duplicate_detection: bool = False
+    near_duplicate_threshold: float = 0.85
+    near_duplicate_num_perm: int = 128
+    shingle_size: int = 5
+    duplicate_fpr: Optional[float] = None
+    expected_docs: int = 10_000_000
+    filter_order: Tuple[str, ...] = _FILTER_NAMES
+
+    def __post_init__(self):
+        # リストで指定された場合もタプルにそろえる（frozenのため__setattr__を経由しない）
+        object.__setattr__(self, 'filter_order', tuple(self.filter_order))
+        if sorted(self.filter_order) != sorted(_FILTER_NAMES):
+            raise ValueError(f"filter_orderは{', '.join(_FILTER_NAMES)}を1つずつ並べたものである必要があります: {self.filter_order}")
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> 'CleanerConfig':
+        """辞書から設定を作成（設定項目にないキーは無視する）"""
+        names = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in config.items() if key in names})
@@ -2,15 +2,20 @@
 
 import re
 import math
-from typing import Optional, List
+import hashlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List
 
 try:
     import torch
+    import torch.nn.functional as F
     from transformers import AutoTokenizer, AutoModelForCausalLM
     TORCH_AVAILABLE = True
 except ImportError:
     TORCH_AVAILABLE = False
     torch = None
+    F = None
     AutoTokenizer = None
     AutoModelForCausalLM = None
 
@@ -23,7 +28,11 @@ class PerplexityCalculator:
         model_name: str = "rinna/gemma-2-baku-2b",
         device: Optional[str] = None,
         batch_size: int = 8,
-        max_length: int = 512
+        max_length: int = 512,
+        attn_implementation: Optional[str] = "sdpa",
+        compile_model: bool = False,
+        quantization: Optional[str] = None,
+        cache_path: Optional[str] = None
     ):
         """
         Args:
@@ -31,11 +40,21 @@ class PerplexityCalculator:
             device: 使用するデバイス（Noneの場合は自動選択）
             batch_size: バッチサイズ
             max_length: 最大トークン長
+            attn_implementation: Attentionの実装（"sdpa"、"flash_attention_2"など、Noneの場合はtransformersの既定。
+                モデルが対応していない場合は既定の実装で読み込む）
+            compile_model: torch.compileでモデルをコンパイルするか
+            quantization: 重みの量子化（"8bit"または"4bit"、bitsandbytesとGPUが必要。Noneの場合は量子化しない）
+            cache_path: 計算結果をキャッシュするSQLiteファイルのパス（Noneの場合はキャッシュしない）
         """
+        if quantization not in (None, "8bit", "4bit"):
+            raise ValueError(f"quantizationは'8bit'、'4bit'、Noneのいずれかである必要があります: {quantization}")
         
         self.model_name = model_name
         self.batch_size = batch_size
         self.max_length = max_length
+        self.attn_implementation = attn_implementation
+        self.compile_model = compile_model
+        self.quantization = quantization
         
         # デバイスの設定
         if device is None:
@@ -46,6 +65,17 @@ class PerplexityCalculator:
         self.tokenizer = None
         self.model = None
         self._model_loaded = False
+        
+        # 再実行時に同じテキストを計算し直さないよう、perplexityをディスクにキャッシュする
+        self._cache = None
+        if cache_path is not None:
+            # パイプラインはバッチの評価を別スレッドで行うため、作成したスレッド以外からの利用も許可する
+            # （評価は同時に1つずつ行われる）
+            self._cache = sqlite3.connect(cache_path, check_same_thread=False)
+            self._cache.execute(
+                "CREATE TABLE IF NOT EXISTS perplexity (key BLOB PRIMARY KEY, value REAL NOT NULL)"
+            )
+            self._cache.commit()
     
     def _load_model(self):
         """モデルを読み込む（遅延読み込み）"""
@@ -59,15 +89,33 @@ class PerplexityCalculator:
         for attempt in range(max_retries):
             try:
                 self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-                self.model = AutoModelForCausalLM.from_pretrained(
-                    self.model_name,
-                    dtype=torch.float16 if self.device == "cuda" else torch.float32
-                )
-                self.model.to(self.device)
+                model_kwargs = {'dtype': self._model_dtype()}
+                if self.attn_implementation is not None:
+                    model_kwargs['attn_implementation'] = self.attn_implementation
+                if self.quantization is not None:
+                    # 量子化したモデルは読み込み時にデバイスへ配置され、後から移動できない
+                    model_kwargs['quantization_config'] = self._quantization_config()
+                    model_kwargs['device_map'] = self.device
+                try:
+                    self.model = AutoModelForCausalLM.from_pretrained(self.model_name, **model_kwargs)
+                except ValueError:
+                    if 'attn_implementation' not in model_kwargs:
+                        raise
+                    # 指定したAttentionの実装に対応していないモデルは、transformersの既定の実装で読み込む
+                    print(f"警告: {self.model_name}は{self.attn_implementation}に対応していないため、既定のAttentionの実装で読み込みます。")
+                    self.attn_implementation = None
+                    del model_kwargs['attn_implementation']
+                    self.model = AutoModelForCausalLM.from_pretrained(self.model_name, **model_kwargs)
+                if self.quantization is None:
+                    self.model.to(self.device)
                 self.model.eval()
+                if self.compile_model:
+                    self.model = torch.compile(self.model, mode="reduce-overhead")
                 
                 if self.tokenizer.pad_token is None:
                     self.tokenizer.pad_token = self.tokenizer.eos_token
+                # バッチ計算ではパディングが末尾にある前提で損失をマスクする
+                self.tokenizer.padding_side = "right"
                 
                 self._model_loaded = True
                 return
@@ -79,6 +127,55 @@ class PerplexityCalculator:
                 else:
                     raise RuntimeError(f"モデルの読み込みに失敗しました（{max_retries}回試行）: {e}")
     
+    def _model_dtype(self):
+        """モデルの重みの型（bfloat16に対応したGPUではbfloat16、それ以外のGPUではfloat16、CPUではfloat32）"""
+        if not str(self.device).startswith("cuda"):
+            return torch.float32
+        if torch.cuda.is_bf16_supported():
+            return torch.bfloat16
+        return torch.float16
+    
+    def _quantization_config(self):
+        """bitsandbytesによる量子化の設定"""
+        from transformers import BitsAndBytesConfig
+        
+        if self.quantization == "8bit":
+            return BitsAndBytesConfig(load_in_8bit=True)
+        # 4bitはNF4で量子化し、演算はモデルの重みと同じ型で行う
+        return BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_quant_type="nf4",
+            bnb_4bit_compute_dtype=self._model_dtype()
+        )
+    
+    def _cache_key(self, text: str) -> bytes:
+        """キャッシュのキー（値はモデル・最大トークン長・量子化によって変わるため、これらも含めてハッシュする）"""
+        key_source = f"{self.model_name}\0{self.max_length}\0{self.quantization}\0{text}"
+        return hashlib.blake2b(key_source.encode('utf-8'), digest_size=16).digest()
+    
+    def _cache_get(self, keys: List[bytes]) -> Dict[bytes, float]:
+        """キャッシュ済みのperplexityを取得"""
+        if self._cache is None or not keys:
+            return {}
+        cached = {}
+        # SQLiteの変数の上限を超えないよう分けて問い合わせる
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cached.update(self._cache.execute(
+                f"SELECT key, value FROM perplexity WHERE key IN ({placeholders})", chunk
+            ))
+        return cached
+    
+    def _cache_put(self, items: List[tuple]):
+        """計算したperplexityをキャッシュに保存（計算に失敗した結果は保存しない）"""
+        if self._cache is None:
+            return
+        items = [(key, value) for key, value in items if value is not None]
+        if items:
+            self._cache.executemany("INSERT OR REPLACE INTO perplexity (key, value) VALUES (?, ?)", items)
+            self._cache.commit()
+    
     def calculate_perplexity(self, text: str) -> Optional[float]:
         """
         テキストのperplexityを計算
@@ -92,6 +189,20 @@ class PerplexityCalculator:
         if not text or not text.strip():
             return None
         
+        # キャッシュにあればモデルを使わずに返す
+        if self._cache is not None:
+            key = self._cache_key(text)
+            cached = self._cache_get([key])
+            if key in cached:
+                return cached[key]
+            perplexity = self._calculate_perplexity(text)
+            self._cache_put([(key, perplexity)])
+            return perplexity
+        
+        return self._calculate_perplexity(text)
+    
+    def _calculate_perplexity(self, text: str) -> Optional[float]:
+        """キャッシュを使わずにテキストのperplexityを計算"""
         # モデルが読み込まれていない場合は読み込む
         if not self._model_loaded:
             self._load_model()
@@ -107,7 +218,7 @@ class PerplexityCalculator:
             ).to(self.device)
             
             # Perplexityを計算
-            with torch.no_grad():
+            with torch.inference_mode():
                 outputs = self.model(**inputs, labels=inputs["input_ids"])
                 loss = outputs.loss.item()
                 perplexity = math.exp(loss)
@@ -131,25 +242,95 @@ class PerplexityCalculator:
         if not texts:
             return []
         
+        results: List[Optional[float]] = [None] * len(texts)
+        
+        # 空のテキストは計算せずNoneのままにする
+        indices = [i for i, text in enumerate(texts) if text and text.strip()]
+        
+        # キャッシュにあるテキストは計算しない
+        keys: Dict[int, bytes] = {}
+        if self._cache is not None:
+            keys = {i: self._cache_key(texts[i]) for i in indices}
+            cached = self._cache_get(list(set(keys.values())))
+            for i in indices:
+                if keys[i] in cached:
+                    results[i] = cached[keys[i]]
+            indices = [i for i in indices if keys[i] not in cached]
+        
+        if not indices:
+            return results
+        
         # モデルが読み込まれていない場合は読み込む
         if not self._model_loaded:
             self._load_model()
         
-        results = []
+        # パディングなしで1回だけトークン化し、トークン数の順に並べて長さの近いテキストでバッチを作る
+        # （バッチ内の最長のテキストに合わせるパディングを減らし、結果は元の順序に戻す）
+        encodings = self.tokenizer(
+            [texts[i] for i in indices],
+            truncation=True,
+            max_length=self.max_length
+        )["input_ids"]
+        order = sorted(range(len(indices)), key=lambda j: len(encodings[j]))
+        batch_orders = [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
         
-        # バッチ処理
-        for i in range(0, len(texts), self.batch_size):
-            batch_texts = texts[i:i + self.batch_size]
-            batch_results = []
+        # バッチ処理（バッチごとにパディングしたテンソルで1回だけ順伝播する）
+        # 次のバッチのパディングとテンソル化は別スレッドで行い、順伝播と重ねる
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            def collate(batch_order):
+                return self._collate_batch([encodings[j] for j in batch_order])
             
-            for text in batch_texts:
-                perplexity = self.calculate_perplexity(text)
-                batch_results.append(perplexity)
-            
-            results.extend(batch_results)
+            pending = executor.submit(collate, batch_orders[0])
+            for n, batch_order in enumerate(batch_orders):
+                current = pending
+                if n + 1 < len(batch_orders):
+                    pending = executor.submit(collate, batch_orders[n + 1])
+                
+                try:
+                    batch_results = self._forward_batch(current.result())
+                except Exception:
+                    # バッチでの計算に失敗した場合は1件ずつ計算する
+                    batch_results = [self._calculate_perplexity(texts[indices[j]]) for j in batch_order]
+                
+                for j, perplexity in zip(batch_order, batch_results):
+                    results[indices[j]] = perplexity
+        
+        self._cache_put([(keys[i], results[i]) for i in indices] if keys else [])
         
         return results
     
+    def _collate_batch(self, input_ids: List[List[int]]):
+        """トークン化済みのテキストをパディングしてCPU上のテンソルにする（GPUの場合は非同期に転送できるようピン留めする）"""
+        inputs = self.tokenizer.pad(
+            {"input_ids": input_ids},
+            padding=True,
+            return_tensors="pt"
+        )
+        if str(self.device).startswith("cuda"):
+            inputs = {name: tensor.pin_memory() for name, tensor in inputs.items()}
+        return inputs
+    
+    def _forward_batch(self, inputs) -> List[float]:
+        """パディング済みのバッチを1回の順伝播で評価し、テキストごとのperplexityを返す"""
+        inputs = {name: tensor.to(self.device, non_blocking=True) for name, tensor in inputs.items()}
+        
+        with torch.inference_mode():
+            logits = self.model(**inputs).logits
+            
+            # 次トークン予測の交差エントロピーをトークンごとに求め、パディング位置を除いて文ごとに平均する
+            # （labelsを渡した場合の損失と同じく、ロジットはfloat32で計算する）
+            shift_logits = logits[:, :-1].float()
+            shift_labels = inputs["input_ids"][:, 1:]
+            shift_mask = inputs["attention_mask"][:, 1:].to(shift_logits.dtype)
+            token_losses = F.cross_entropy(
+                shift_logits.transpose(1, 2),
+                shift_labels,
+                reduction="none"
+            )
+            losses = (token_losses * shift_mask).sum(dim=-1) / shift_mask.sum(dim=-1)
+        
+        return [math.exp(loss) for loss in losses.cpu().tolist()]
+    
     def is_high_quality(self, text: str, max_perplexity: float = 50.0) -> bool:
         """
         テキストが高品質かどうかを判定
@@ -168,4 +349,19 @@ class PerplexityCalculator:
             return False
         
         return perplexity <= max_perplexity
-
+    
+    def is_high_quality_batch(self, texts: List[str], max_perplexity: float = 50.0) -> List[bool]:
+        """
+        複数のテキストが高品質かどうかをバッチで判定
+        
+        Args:
+            texts: 評価するテキストのリスト
+            max_perplexity: 許容される最大perplexity値
+            
+        Returns:
+            テキストごとの判定結果（計算に失敗したテキストはFalse）
+        """
+        return [
+            perplexity is not None and perplexity <= max_perplexity
+            for perplexity in self.calculate_perplexity_batch(texts)
+        ]
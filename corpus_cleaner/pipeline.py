@@ -1,13 +1,35 @@
 """3段階処理パイプライン"""
 
+import hashlib
 import json
+import math
+import mmap
+import os
 import unicodedata
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Union
 from pathlib import Path
 from tqdm import tqdm
 
 from .cleaner import CorpusCleaner
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+    xxhash = None
+
 try:
     import kenlm
     KENLM_AVAILABLE = True
@@ -29,6 +51,139 @@ except ImportError:
     LLM_AVAILABLE = False
     PerplexityCalculator = None
 
+# 行数を数える際に1回で読み込むバイト数
+_COUNT_LINES_CHUNK_SIZE = 1 << 20
+# 出力をファイルに書き出すまでにためるバイト数
+_WRITE_BUFFER_SIZE = 1 << 20
+# KenLMのperplexity（常用対数）のキャッシュに保持する件数の上限（超えた場合は最も長く使われていないものから捨てる）
+_KENLM_CACHE_SIZE = 1_000_000
+# Phase 1でclean_batch()にまとめて渡すエントリ数
+_CLEAN_BATCH_SIZE = 256
+# 進捗バーをまとめて進める行数（1行ごとのupdate()の呼び出しと表示の更新を省く）
+_PROGRESS_UPDATE_LINES = 1000
+
+
+def _load_entry(line: bytes) -> Any:
+    """JSONLの1行をデコード（orjsonが利用可能な場合はorjsonを使用）"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            # orjsonが受け付けない値（NaN、64bitを超える整数、不正なUTF-8など）は標準のjsonでデコードする
+            pass
+    # 不正なUTF-8のバイト列は置換文字にしてからデコードする
+    return json.loads(line.decode('utf-8', 'replace'))
+
+
+def _progress_bar(total: Optional[int], desc: str, show_progress: bool) -> tqdm:
+    """進捗バーを作成（表示の更新は最短でも0.5秒ごと・1000行ごとに抑える）"""
+    return tqdm(
+        total=total,
+        desc=desc,
+        disable=not show_progress,
+        mininterval=0.5,
+        miniters=_PROGRESS_UPDATE_LINES,
+        smoothing=0.01,
+    )
+
+
+@contextmanager
+def _mapped_lines(path: Union[str, Path]) -> Iterator[Iterator[bytes]]:
+    """ファイルをメモリマップし、各行（改行を含むバイト列）を順に返すイテレータを渡す"""
+    # テキストとしてデコードせずに行を切り出し、JSONのデコードでまとめてUTF-8を解釈する
+    with open(path, 'rb') as f:
+        # 空のファイルはメモリマップできない
+        if os.fstat(f.fileno()).st_size == 0:
+            yield iter(())
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield iter(mapped.readline, b'')
+
+
+def _has_non_finite(value: Any) -> bool:
+    """NaN・Infinityの浮動小数点数を含むか"""
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(_has_non_finite(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_has_non_finite(item) for item in value)
+    return False
+
+
+def _dump_entry(entry: Any) -> bytes:
+    """エントリを改行付きのJSONLの1行（UTF-8）にエンコード（orjsonが利用可能な場合はorjsonを使用）"""
+    if ORJSON_AVAILABLE:
+        try:
+            dumped = orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            # orjsonがエンコードできない値（64bitを超える整数など）は標準のjsonでエンコードする
+            pass
+        else:
+            # orjsonはNaN・Infinityをnullとして書き出すため、入力と同じ表記で書き出せるよう標準のjsonでエンコードする
+            # （nullを含まない行には非有限の値もないので、値をたどるのはnullを含む行だけにする）
+            if b'null' not in dumped or not _has_non_finite(entry):
+                return dumped
+    return (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def _text_digest(text: str) -> int:
+    """テキストの64bitダイジェスト（キャッシュのキー）"""
+    encoded = text.encode('utf-8', 'surrogatepass')
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_64_intdigest(encoded)
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), 'little')
+
+
+def _count_lines(file_path: Union[str, Path]) -> int:
+    """ファイルの行数をカウント"""
+    # デコードせずにバイト列のまま読み、改行の数を数える
+    try:
+        count = 0
+        last_byte = b'\n'
+        with open(file_path, 'rb') as f:
+            while chunk := f.read(_COUNT_LINES_CHUNK_SIZE):
+                count += chunk.count(b'\n')
+                last_byte = chunk[-1:]
+        # 改行で終わらない最後の行も1行と数える
+        if last_byte != b'\n':
+            count += 1
+        return count
+    except Exception:
+        return -1
+
+
+class _JSONLWriter:
+    """エントリをJSONLとして書き出す（書き込みの回数を減らすため、一定量たまるまでバッファに保持する）"""
+    
+    def __init__(self, path: Union[str, Path]):
+        self._file = open(path, 'wb')
+        self._buffer = bytearray()
+    
+    def write(self, entry: Any):
+        """エントリを1行として追加"""
+        self._buffer += _dump_entry(entry)
+        if len(self._buffer) >= _WRITE_BUFFER_SIZE:
+            self.flush()
+    
+    def flush(self):
+        """バッファの内容をファイルに書き出す"""
+        self._file.write(self._buffer)
+        self._buffer.clear()
+    
+    def close(self):
+        """バッファの内容を書き出してファイルを閉じる"""
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 
 class ProcessingPipeline:
     """3段階処理パイプライン"""
@@ -43,7 +198,15 @@ class ProcessingPipeline:
         use_llm: Optional[bool] = None,
         llm_model_name: str = "rinna/gemma-2-baku-2b",
         max_llm_perplexity: float = 50.0,
-        auto_detect_models: bool = True
+        auto_detect_models: bool = True,
+        llm_quantization: Optional[str] = None,
+        llm_cache_path: Optional[str] = None,
+        llm_compile: bool = False,
+        num_proc: int = 1,
+        staged: bool = False,
+        llm_batch_size: int = 32,
+        kenlm_cache: bool = True,
+        keep_intermediates: bool = False
     ):
         """
         Args:
@@ -55,12 +218,27 @@ class ProcessingPipeline:
             llm_model_name: LLMモデル名
             max_llm_perplexity: LLMの最大perplexity値
             auto_detect_models: モデルの自動検出を有効化するか
+            llm_quantization: LLMの重みの量子化（"8bit"、"4bit"、Noneの場合は量子化しない）
+            llm_cache_path: LLMのperplexityをキャッシュするSQLiteファイルのパス（Noneの場合はキャッシュしない）
+            llm_compile: LLMをtorch.compileでコンパイルするか
+            num_proc: Phase 1のクリーニングに使うプロセス数（1の場合はこのプロセスだけで処理する）
+            staged: フェーズごとに中間ファイルへ書き出して処理するか（Falseの場合は1回の走査で全フェーズを適用する）
+            llm_batch_size: LLMでまとめて評価するテキストの数
+            kenlm_cache: KenLMのperplexityをテキストのハッシュ値でキャッシュするか（正規化後に同じになるテキストの再計算を省く）
+            keep_intermediates: stagedの場合に中間ファイルを後続のフェーズの完了後も残すか
         """
         self.cleaner = cleaner
+        # 設定はこの後変わらないため、Phase 1の判定を設定に合わせて特殊化しておく
+        self.cleaner.specialize()
         self.text_field = text_field
         self.max_kenlm_perplexity = max_kenlm_perplexity
         self.max_llm_perplexity = max_llm_perplexity
         self.auto_detect_models = auto_detect_models
+        self.num_proc = num_proc
+        self.staged = staged
+        self.keep_intermediates = keep_intermediates
+        self.llm_batch_size = llm_batch_size
+        self._kenlm_cache: Optional[OrderedDict] = OrderedDict() if kenlm_cache else None
         
         self.kenlm_model = None
         self.sentencepiece_model = None
@@ -68,8 +246,6 @@ class ProcessingPipeline:
         if not KENLM_AVAILABLE:
             return
         
-        import os
-        
         if kenlm_model_path:
             if os.path.exists(kenlm_model_path):
                 try:
@@ -113,7 +289,11 @@ class ProcessingPipeline:
             if LLM_AVAILABLE:
                 try:
                     self.llm_calculator = PerplexityCalculator(
-                        model_name=llm_model_name
+                        model_name=llm_model_name,
+                        batch_size=llm_batch_size,
+                        quantization=llm_quantization,
+                        cache_path=llm_cache_path,
+                        compile_model=llm_compile
                     )
                     print(f"LLMモデルを読み込みました: {llm_model_name}")
                     self.use_llm = True
@@ -128,8 +308,8 @@ class ProcessingPipeline:
     
     def process_file(
         self,
-        input_path: str,
-        output_path: str,
+        input_path: Union[str, Path],
+        output_path: Union[str, Path],
         show_progress: bool = True
     ) -> Dict[str, Any]:
         """
@@ -147,31 +327,42 @@ class ProcessingPipeline:
         if not input_file.exists():
             raise FileNotFoundError(f"入力ファイルが見つかりません: {input_path}")
         
-        phase1_output = str(Path(output_path).parent / f"{Path(output_path).stem}_phase1.jsonl")
+        if not self.staged:
+            return self._fused_process(input_file, output_path, show_progress)
+        
+        # 中間ファイルのパスは出力ファイルのパスから一度だけ組み立て、Pathのまま各フェーズへ渡す
+        # （後続のフェーズがない場合は出力ファイルへ直接書き出し、コピーを省く）
+        output_file = Path(output_path)
+        output_dir = output_file.parent
+        output_stem = output_file.stem
+        use_kenlm = bool(self.kenlm_model)
+        use_llm = bool(self.use_llm and self.llm_calculator)
+        
+        phase1_output = output_dir / f"{output_stem}_phase1.jsonl" if use_kenlm or use_llm else output_file
         print("=" * 60)
         print("Phase 1: 基本クリーニング処理")
         print("=" * 60)
-        phase1_stats = self._basic_cleaning(input_path, phase1_output, show_progress)
+        phase1_stats = self._basic_cleaning(input_file, phase1_output, show_progress)
         
-        phase2_output = str(Path(output_path).parent / f"{Path(output_path).stem}_phase2.jsonl")
-        if self.kenlm_model:
+        if use_kenlm:
+            phase2_output = output_dir / f"{output_stem}_phase2.jsonl" if use_llm else output_file
             print("\n" + "=" * 60)
             print("Phase 2: KenLMによる高速perplexity評価")
             print("=" * 60)
             phase2_stats = self._kenlm_filtering(phase1_output, phase2_output, show_progress)
+            self._remove_intermediate(phase1_output)
         else:
             print("\nKenLMモデルが利用できないため、Phase 2をスキップします。")
             phase2_output = phase1_output
             phase2_stats = {}
         
-        if self.use_llm and self.llm_calculator:
+        if use_llm:
             print("\n" + "=" * 60)
             print("Phase 3: LLMによる最終評価")
             print("=" * 60)
-            final_stats = self._llm_filtering(phase2_output, output_path, show_progress)
+            final_stats = self._llm_filtering(phase2_output, output_file, show_progress)
+            self._remove_intermediate(phase2_output)
         else:
-            import shutil
-            shutil.copy(phase2_output, output_path)
             final_stats = {}
         
         stats = {
@@ -182,45 +373,135 @@ class ProcessingPipeline:
         
         return stats
     
+    def _remove_intermediate(self, path: Path) -> None:
+        """次のフェーズで読み終えた中間ファイルを削除（keep_intermediatesが指定されている場合は残す）"""
+        if not self.keep_intermediates:
+            path.unlink()
+    
     def _basic_cleaning(
         self,
-        input_path: str,
-        output_path: str,
+        input_path: Union[str, Path],
+        output_path: Union[str, Path],
         show_progress: bool
     ) -> Dict[str, Any]:
         """Phase 1: 基本クリーニング処理"""
-        total_lines = self._count_lines(input_path)
+        # プログレスバーを表示しない場合は行数を数えるためだけにファイルを読まない
+        total_lines = _count_lines(input_path) if show_progress else None
         
-        with open(input_path, 'r', encoding='utf-8', errors='replace') as infile, \
-             open(output_path, 'w', encoding='utf-8') as outfile:
+        with _mapped_lines(input_path) as infile, \
+             _JSONLWriter(output_path) as outfile:
             
-            pbar = tqdm(total=total_lines, desc="Phase 1: 基本クリーニング", disable=not show_progress)
-            total_processed = 0
-            total_kept = 0
+            pbar = _progress_bar(total_lines, "Phase 1: 基本クリーニング", show_progress)
+            line_counts = {'total_processed': 0}
+            phase1_counts = {'total_kept': 0}
             
             try:
-                for line in infile:
-                    total_processed += 1
-                    
-                    try:
-                        entry = json.loads(line.strip())
-                    except json.JSONDecodeError:
-                        self.cleaner.stats['json_decode_error'] += 1
-                        pbar.update(1)
-                        continue
-                    
-                    cleaned_entry = self.cleaner.clean(entry, self.text_field)
-                    
-                    if cleaned_entry is not None:
-                        json.dump(cleaned_entry, outfile, ensure_ascii=False)
-                        outfile.write('\n')
-                        total_kept += 1
-                    
-                    pbar.update(1)
+                entries = self._read_entries(infile, pbar, line_counts, count_decode_errors=True)
+                for entry in self._phase1_iter(entries, phase1_counts):
+                    outfile.write(entry)
+            
+            finally:
+                pbar.close()
+        
+        return self._phase1_stats(line_counts['total_processed'], phase1_counts['total_kept'])
+    
+    def _fused_process(
+        self,
+        input_path: Union[str, Path],
+        output_path: Union[str, Path],
+        show_progress: bool
+    ) -> Dict[str, Any]:
+        """全フェーズを1回の走査で適用（中間ファイルを作らず、各エントリのデコードとエンコードも1回で済ませる）"""
+        use_kenlm = self.kenlm_model is not None
+        use_llm = bool(self.use_llm and self.llm_calculator)
+        
+        print("=" * 60)
+        print("Phase 1-3: クリーニング・KenLM評価・LLM評価を1回の走査で処理")
+        print("=" * 60)
+        if not use_kenlm:
+            print("KenLMモデルが利用できないため、Phase 2をスキップします。")
+        
+        # プログレスバーを表示しない場合は行数を数えるためだけにファイルを読まない
+        total_lines = _count_lines(input_path) if show_progress else None
+        line_counts = {'total_processed': 0}
+        phase1_counts = {'total_kept': 0}
+        phase2_stats = {'total_processed': 0, 'total_kept': 0, 'total_excluded': 0}
+        phase3_stats = {'total_processed': 0, 'total_kept': 0, 'total_excluded': 0}
+        
+        with _mapped_lines(input_path) as infile, \
+             _JSONLWriter(output_path) as outfile:
+            
+            pbar = _progress_bar(total_lines, "クリーニング", show_progress)
+            
+            try:
+                # 各フェーズをジェネレータでつなぎ、エントリをファイルを介さずに次のフェーズへ渡す
+                entries = self._read_entries(infile, pbar, line_counts, count_decode_errors=True)
+                entries = self._phase1_iter(entries, phase1_counts)
+                if use_kenlm:
+                    entries = self._phase2_iter(entries, phase2_stats)
+                if use_llm:
+                    entries = self._phase3_iter(entries, phase3_stats)
+                
+                for entry in entries:
+                    outfile.write(entry)
             
             finally:
                 pbar.close()
         
+        return {
+            'phase1': self._phase1_stats(line_counts['total_processed'], phase1_counts['total_kept']),
+            'phase2': phase2_stats if use_kenlm else {},
+            'phase3': phase3_stats if use_llm else {},
+        }
+    
+    def _read_entries(self, infile, pbar, line_counts: Dict[str, int], count_decode_errors: bool = False):
+        """デコードできた行のエントリを順に返す（読み込んだ行数を数え、進捗も読み込んだ行数で表示する）"""
+        # 進捗バーは_PROGRESS_UPDATE_LINES行ごとにまとめて進め、残りは読み終えた時点で反映する
+        unreported = 0
+        try:
+            for line in infile:
+                line_counts['total_processed'] += 1
+                unreported += 1
+                if unreported == _PROGRESS_UPDATE_LINES:
+                    pbar.update(unreported)
+                    unreported = 0
+                
+                try:
+                    yield _load_entry(line)
+                except json.JSONDecodeError:
+                    if count_decode_errors:
+                        self.cleaner.stats['json_decode_error'] += 1
+        finally:
+            if unreported:
+                pbar.update(unreported)
+    
+    def _clean_entries(self, entries):
+        """エントリをPhase 1でクリーニングし、入力順に結果（除外された場合はNone）を返す"""
+        if self.num_proc > 1:
+            # 重複チェック以外はワーカープロセスで並列に行い、結果は入力順に受け取る
+            return self.cleaner.clean_parallel(entries, self.text_field, workers=self.num_proc)
+        return self._clean_batches(entries)
+    
+    def _clean_batches(self, entries: Iterable[Dict[str, Any]]) -> Iterator[Optional[Dict[str, Any]]]:
+        """エントリを_CLEAN_BATCH_SIZE件ずつclean_batch()でクリーニングし、入力順に結果を返す"""
+        clean_batch = self.cleaner.clean_batch
+        text_field = self.text_field
+        iterator = iter(entries)
+        while True:
+            batch = list(islice(iterator, _CLEAN_BATCH_SIZE))
+            if not batch:
+                return
+            yield from clean_batch(batch, text_field)
+    
+    def _phase1_iter(self, entries: Iterable[Dict[str, Any]], counts: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+        """Phase 1: クリーニングを通過したエントリを返す（通過した数をcountsに数える）"""
+        for entry in self._clean_entries(entries):
+            if entry is not None:
+                counts['total_kept'] += 1
+                yield entry
+    
+    def _phase1_stats(self, total_processed: int, total_kept: int) -> Dict[str, Any]:
+        """Phase 1の統計情報"""
         stats = self.cleaner.get_stats()
         stats['total_processed'] = total_processed
         stats['total_kept'] = total_kept
@@ -230,122 +511,172 @@ class ProcessingPipeline:
     
     def _kenlm_filtering(
         self,
-        input_path: str,
-        output_path: str,
+        input_path: Union[str, Path],
+        output_path: Union[str, Path],
         show_progress: bool
     ) -> Dict[str, Any]:
         """Phase 2: KenLMによる高速perplexity評価"""
+        # プログレスバーを表示しない場合は行数を数えるためだけにファイルを読まない
+        total_lines = _count_lines(input_path) if show_progress else None
+        stats = {'total_processed': 0, 'total_kept': 0, 'total_excluded': 0}
         
-        total_lines = self._count_lines(input_path)
-        total_processed = 0
-        total_kept = 0
-        total_filtered = 0
-        
-        with open(input_path, 'r', encoding='utf-8', errors='replace') as infile, \
-             open(output_path, 'w', encoding='utf-8') as outfile:
+        with _mapped_lines(input_path) as infile, \
+             _JSONLWriter(output_path) as outfile:
             
-            pbar = tqdm(total=total_lines, desc="Phase 2: KenLM評価", disable=not show_progress)
+            pbar = _progress_bar(total_lines, "Phase 2: KenLM評価", show_progress)
             
             try:
-                for line in infile:
-                    total_processed += 1
-                    
-                    try:
-                        entry = json.loads(line.strip())
-                    except json.JSONDecodeError:
-                        pbar.update(1)
-                        continue
-                    
-                    text = entry.get(self.text_field, '')
-                    if not text:
-                        pbar.update(1)
-                        continue
-                    
-                    try:
-                        if self.sentencepiece_model:
-                            normalized_text = unicodedata.normalize('NFD', text)
-                            tokens = self.sentencepiece_model.encode(normalized_text, out_type=str)
-                            sentence = " ".join(tokens)
-                        else:
-                            sentence = " ".join(text)
-                        
-                        perplexity = self.kenlm_model.perplexity(sentence)
-                        
-                        if perplexity <= self.max_kenlm_perplexity:
-                            json.dump(entry, outfile, ensure_ascii=False)
-                            outfile.write('\n')
-                            total_kept += 1
-                        else:
-                            total_filtered += 1
-                    except Exception:
-                        total_filtered += 1
-                    
-                    pbar.update(1)
+                # 処理数はデコードできなかった行も含めた行数とする
+                for entry in self._phase2_iter(self._read_entries(infile, pbar, stats), stats, count_processed=False):
+                    outfile.write(entry)
             
             finally:
                 pbar.close()
         
-        return {
-            'total_processed': total_processed,
-            'total_kept': total_kept,
-            'total_excluded': total_filtered
-        }
+        return stats
+    
+    def _phase2_iter(
+        self,
+        entries: Iterable[Dict[str, Any]],
+        stats: Dict[str, int],
+        count_processed: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """Phase 2: KenLMのperplexityが閾値以下のエントリを返す（テキストが空のエントリは処理数にだけ数えて除外する）"""
+        # 閾値の対数とメソッドはループの外で一度だけ求める
+        max_log_perplexity = self._max_kenlm_log_perplexity()
+        passes_kenlm = self._passes_kenlm
+        text_field = self.text_field
+        for entry in entries:
+            if count_processed:
+                stats['total_processed'] += 1
+            
+            text = entry.get(text_field, '')
+            if not text:
+                continue
+            
+            if passes_kenlm(text, max_log_perplexity):
+                stats['total_kept'] += 1
+                yield entry
+            else:
+                stats['total_excluded'] += 1
+    
+    def _max_kenlm_log_perplexity(self) -> float:
+        """KenLMのperplexityの閾値の常用対数"""
+        # perplexityは1以上なので、閾値が0以下の場合は常に除外する
+        max_perplexity = self.max_kenlm_perplexity
+        return math.log10(max_perplexity) if max_perplexity > 0 else -math.inf
+    
+    def _passes_kenlm(self, text: str, max_log_perplexity: float) -> bool:
+        """KenLMのperplexityの常用対数が閾値の常用対数以下かどうか（計算に失敗した場合はFalse）"""
+        # perplexity = 10^(-score/単語数)なので、指数を取らずに対数のまま閾値と比べる
+        cache = self._kenlm_cache
+        if cache is not None:
+            key = _text_digest(text)
+            log_perplexity = cache.get(key)
+            if log_perplexity is not None:
+                cache.move_to_end(key)
+                return log_perplexity <= max_log_perplexity
+        
+        try:
+            log_perplexity = self._kenlm_log_perplexity(text)
+        except Exception:
+            return False
+        
+        if cache is not None:
+            cache[key] = log_perplexity
+            if len(cache) > _KENLM_CACHE_SIZE:
+                cache.popitem(last=False)
+        return log_perplexity <= max_log_perplexity
+    
+    def _kenlm_log_perplexity(self, text: str) -> float:
+        """KenLMでテキストのperplexityの常用対数を計算"""
+        # 単語数はkenlm.Model.perplexityと同じく空白区切りの単語数に文末記号の1を足したもの
+        if self.sentencepiece_model:
+            normalized_text = unicodedata.normalize('NFD', text)
+            tokens = self.sentencepiece_model.encode(normalized_text, out_type=str)
+            sentence = " ".join(tokens)
+            # トークンが改行などの空白を含むモデルもあるため、区切った文字列から数える
+            words = len(sentence.split()) + 1
+        else:
+            sentence = " ".join(text)
+            # 1文字ずつ区切るので、単語数は空白以外の文字数になる（1文字ずつの文字列に分割せずに数える）
+            words = len(''.join(text.split())) + 1
+        
+        return -self.kenlm_model.score(sentence) / words
     
     def _llm_filtering(
         self,
-        input_path: str,
-        output_path: str,
+        input_path: Union[str, Path],
+        output_path: Union[str, Path],
         show_progress: bool
     ) -> Dict[str, Any]:
         """Phase 3: LLMによる最終評価"""
-        total_lines = self._count_lines(input_path)
-        total_processed = 0
-        total_kept = 0
-        total_filtered = 0
+        # プログレスバーを表示しない場合は行数を数えるためだけにファイルを読まない
+        total_lines = _count_lines(input_path) if show_progress else None
+        stats = {'total_processed': 0, 'total_kept': 0, 'total_excluded': 0}
         
-        with open(input_path, 'r', encoding='utf-8', errors='replace') as infile, \
-             open(output_path, 'w', encoding='utf-8') as outfile:
+        with _mapped_lines(input_path) as infile, \
+             _JSONLWriter(output_path) as outfile:
             
-            pbar = tqdm(total=total_lines, desc="Phase 3: LLM評価", disable=not show_progress)
+            pbar = _progress_bar(total_lines, "Phase 3: LLM評価", show_progress)
             
             try:
-                for line in infile:
-                    total_processed += 1
-                    
-                    try:
-                        entry = json.loads(line.strip())
-                    except json.JSONDecodeError:
-                        pbar.update(1)
-                        continue
-                    
-                    text = entry.get(self.text_field, '')
-                    if not text:
-                        pbar.update(1)
-                        continue
-                    
-                    if self.llm_calculator.is_high_quality(text, self.max_llm_perplexity):
-                        json.dump(entry, outfile, ensure_ascii=False)
-                        outfile.write('\n')
-                        total_kept += 1
-                    else:
-                        total_filtered += 1
-                    
-                    pbar.update(1)
+                # 処理数はデコードできなかった行も含めた行数とする
+                for entry in self._phase3_iter(self._read_entries(infile, pbar, stats), stats, count_processed=False):
+                    outfile.write(entry)
             
             finally:
                 pbar.close()
         
-        return {
-            'total_processed': total_processed,
-            'total_kept': total_kept,
-            'total_excluded': total_filtered
-        }
+        return stats
     
-    def _count_lines(self, file_path: str) -> int:
-        """ファイルの行数をカウント"""
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                return sum(1 for _ in f)
-        except Exception:
-            return -1
+    def _phase3_iter(
+        self,
+        entries: Iterable[Dict[str, Any]],
+        stats: Dict[str, int],
+        count_processed: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """Phase 3: LLMで高品質と判定されたエントリを入力順に返す（テキストが空のエントリは処理数にだけ数えて除外する）"""
+        # バッチにまとめて別スレッドで評価し、その間に次のバッチのエントリを読み込む（前のフェーズの処理も進める）
+        # 評価中のバッチは1つまでとし、評価を終えたバッチから返す
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            in_flight = None
+            pending = []
+            for entry in entries:
+                if count_processed:
+                    stats['total_processed'] += 1
+                
+                if not entry.get(self.text_field, ''):
+                    continue
+                
+                pending.append(entry)
+                if len(pending) >= self.llm_batch_size:
+                    if in_flight is not None:
+                        yield from self._collect_llm_batch(*in_flight, stats)
+                    in_flight = (pending, executor.submit(self._llm_keep_flags, pending))
+                    pending = []
+            
+            if in_flight is not None:
+                yield from self._collect_llm_batch(*in_flight, stats)
+            if pending:
+                yield from self._collect_llm_batch(pending, executor.submit(self._llm_keep_flags, pending), stats)
+    
+    def _llm_keep_flags(self, entries: List[Dict[str, Any]]) -> List[bool]:
+        """エントリのテキストをLLMでまとめて評価し、高品質かどうかを返す"""
+        texts = [entry[self.text_field] for entry in entries]
+        return self.llm_calculator.is_high_quality_batch(texts, self.max_llm_perplexity)
+    
+    def _collect_llm_batch(
+        self,
+        entries: List[Dict[str, Any]],
+        future: Future,
+        stats: Dict[str, int]
+    ) -> Iterator[Dict[str, Any]]:
+        """バッチの評価結果を待ち、高品質なエントリを返して統計情報に加える"""
+        for entry, keep in zip(entries, future.result()):
+            if keep:
+                stats['total_kept'] += 1
+                yield entry
+            else:
+                stats['total_excluded'] += 1
 
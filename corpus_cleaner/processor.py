@@ -4,9 +4,9 @@ import json
 import sys
 from typing import Dict, Any
 from pathlib import Path
-from tqdm import tqdm
 
 from .cleaner import CorpusCleaner
+from .pipeline import _PROGRESS_UPDATE_LINES, _count_lines, _dump_entry, _load_entry, _progress_bar
 
 
 class JSONLProcessor:
@@ -44,25 +44,31 @@ class JSONLProcessor:
         if not input_file.exists():
             raise FileNotFoundError(f"入力ファイルが見つかりません: {input_path}")
         
-        # 総行数を取得（プログレスバー用）
-        total_lines = self._count_lines(input_path)
+        # 総行数を取得（プログレスバー用、表示しない場合は行数を数えるためだけにファイルを読まない）
+        total_lines = _count_lines(input_path) if show_progress else None
         
         # ストリーミング処理
-        with open(input_path, 'r', encoding='utf-8') as infile, \
-             open(output_path, 'w', encoding='utf-8') as outfile:
+        # orjsonがバイト列を直接デコード・エンコードできるよう、入出力ともバイナリモードで開く
+        with open(input_path, 'rb') as infile, \
+             open(output_path, 'wb') as outfile:
             
-            pbar = tqdm(total=total_lines, desc="処理中", disable=not show_progress)
+            pbar = _progress_bar(total_lines, "処理中", show_progress)
+            # 進捗バーは_PROGRESS_UPDATE_LINES行ごとにまとめて進め、残りは読み終えた時点で反映する
+            unreported = 0
             
             try:
                 for line in infile:
                     self.total_processed += 1
+                    unreported += 1
+                    if unreported == _PROGRESS_UPDATE_LINES:
+                        pbar.update(unreported)
+                        unreported = 0
                     
                     # JSONパース
                     try:
-                        entry = json.loads(line.strip())
+                        entry = _load_entry(line)
                     except json.JSONDecodeError:
                         self.cleaner.stats['json_decode_error'] += 1
-                        pbar.update(1)
                         continue
                     
                     # クリーニング
@@ -70,13 +76,12 @@ class JSONLProcessor:
                     
                     if cleaned_entry is not None:
                         # 出力
-                        json.dump(cleaned_entry, outfile, ensure_ascii=False)
-                        outfile.write('\n')
+                        outfile.write(_dump_entry(cleaned_entry))
                         self.total_kept += 1
-                    
-                    pbar.update(1)
             
             finally:
+                if unreported:
+                    pbar.update(unreported)
                 pbar.close()
         
         # 統計情報をまとめる
@@ -86,11 +91,3 @@ class JSONLProcessor:
         stats['total_excluded'] = self.total_processed - self.total_kept
         
         return stats
-    
-    def _count_lines(self, file_path: str) -> int:
-        """ファイルの行数をカウント（簡易版）"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return sum(1 for _ in f)
-        except Exception:
-            return -1
@@ -1,186 +1,15 @@
 #!/usr/bin/env python3
 
-import argparse
 import json
 import sys
 from pathlib import Path
 
 from corpus_cleaner.cleaner import CorpusCleaner
+from corpus_cleaner.cli import build_parser, config_from_args
 from corpus_cleaner.pipeline import ProcessingPipeline
 
 def main():
-    parser = argparse.ArgumentParser(
-        prog='corpus_cleaner'
-    )
-    parser.add_argument(
-        'input',
-        type=str,
-        help='入力JSONLファイルのパス'
-    )
-    parser.add_argument(
-        '-o', '--output',
-        type=str,
-        default=None,
-        help='出力JSONLファイルのパス（デフォルト: input_cleaned.jsonl）'
-    )
-    parser.add_argument(
-        '--text-field',
-        type=str,
-        default='content',
-        help='テキストが格納されているフィールド名（デフォルト: content）'
-    )
-    parser.add_argument(
-        '--min-length',
-        type=int,
-        default=10,
-        help='最小文字数（デフォルト: 10）'
-    )
-    parser.add_argument(
-        '--max-length',
-        type=int,
-        default=10000,
-        help='最大文字数（デフォルト: 10000）'
-    )
-    parser.add_argument(
-        '--max-special-char-ratio',
-        type=float,
-        default=0.3,
-        help='特殊記号の最大比率（デフォルト: 0.3）'
-    )
-    parser.add_argument(
-        '--max-code-ratio',
-        type=float,
-        default=0.2,
-        help='コードの最大比率（デフォルト: 0.2）'
-    )
-    parser.add_argument(
-        '--max-html-ratio',
-        type=float,
-        default=0.2,
-        help='HTMLの最大比率（デフォルト: 0.2）'
-    )
-    parser.add_argument(
-        '--max-emoji-ratio',
-        type=float,
-        default=0.1,
-        help='絵文字の最大比率（デフォルト: 0.1）'
-    )
-    parser.add_argument(
-        '--max-repeat-chars',
-        type=int,
-        default=3,
-        help='繰り返し文字の最大回数（デフォルト: 3）'
-    )
-    parser.add_argument(
-        '--max-sentence-length',
-        type=int,
-        default=500,
-        help='1文の最大文字数（デフォルト: 500）'
-    )
-    parser.add_argument(
-        '--require-sentence-end',
-        action='store_true',
-        default=True,
-        help='文末記号（。！？）で終わることを要求（デフォルト: True）'
-    )
-    parser.add_argument(
-        '--no-require-sentence-end',
-        dest='require_sentence_end',
-        action='store_false',
-        help='文末記号の要求を無効化'
-    )
-    parser.add_argument(
-        '--min-sentence-end-ratio',
-        type=float,
-        default=0.7,
-        help='文末記号で終わる文の最小比率（デフォルト: 0.7）'
-    )
-    parser.add_argument(
-        '--min-hiragana-ratio',
-        type=float,
-        default=0.3,
-        help='ひらがなの最小比率（デフォルト: 0.3）'
-    )
-    parser.add_argument(
-        '--max-hiragana-ratio',
-        type=float,
-        default=0.8,
-        help='ひらがなの最大比率（デフォルト: 0.8）'
-    )
-    parser.add_argument(
-        '--min-kanji-ratio',
-        type=float,
-        default=0.1,
-        help='漢字の最小比率（デフォルト: 0.1）'
-    )
-    parser.add_argument(
-        '--max-kanji-ratio',
-        type=float,
-        default=0.5,
-        help='漢字の最大比率（デフォルト: 0.5）'
-    )
-    # Phase 2: KenLM設定
-    parser.add_argument(
-        '--kenlm-model',
-        type=str,
-        default=None,
-        help='KenLMモデルファイルのパス（Phase 2で使用、.bin形式、未指定の場合は自動検出を試みる）'
-    )
-    parser.add_argument(
-        '--sentencepiece-model',
-        type=str,
-        default=None,
-        help='SentencePieceモデルファイルのパス（.model形式、cc_netのja.sp.modelなど）'
-    )
-    parser.add_argument(
-        '--no-kenlm',
-        action='store_true',
-        default=False,
-        help='KenLM処理を無効化'
-    )
-    parser.add_argument(
-        '--max-kenlm-perplexity',
-        type=float,
-        default=15000.0,
-        help='KenLMの最大perplexity値（デフォルト: 500.0）'
-    )
-    # Phase 3: LLM設定
-    parser.add_argument(
-        '--use-llm',
-        action='store_true',
-        default=None,
-        help='LLMによる最終評価を有効化（Phase 3、未指定の場合は自動検出）'
-    )
-    parser.add_argument(
-        '--no-llm',
-        action='store_true',
-        default=False,
-        help='LLM処理を無効化'
-    )
-    parser.add_argument(
-        '--llm-model',
-        type=str,
-        default='rinna/gemma-2-baku-2b',
-        help='LLMモデル名（デフォルト: rinna/gemma-2-baku-2b）'
-    )
-    parser.add_argument(
-        '--max-llm-perplexity',
-        type=float,
-        default=10.0,
-        help='LLMの最大perplexity値（デフォルト: 10.0、値が小さいほど厳格）'
-    )
-    parser.add_argument(
-        '--no-auto-detect',
-        action='store_true',
-        default=False,
-        help='モデルの自動検出を無効化'
-    )
-    parser.add_argument(
-        '--stats-output',
-        type=str,
-        default=None,
-        help='統計情報を出力するJSONファイルのパス（デフォルト: statistics.json）'
-    )
+    parser = build_parser()
     
     args = parser.parse_args()
     
@@ -193,23 +22,8 @@ def main():
     if args.stats_output is None:
         args.stats_output = "statistics.json"
     
-    # 設定の作成
-    config = {
-        'min_length': args.min_length,
-        'max_length': args.max_length,
-        'max_special_char_ratio': args.max_special_char_ratio,
-        'max_code_ratio': args.max_code_ratio,
-        'max_html_ratio': args.max_html_ratio,
-        'max_emoji_ratio': args.max_emoji_ratio,
-        'max_repeat_chars': args.max_repeat_chars,
-        'max_sentence_length': args.max_sentence_length,
-        'require_sentence_end': args.require_sentence_end,
-        'min_sentence_end_ratio': args.min_sentence_end_ratio,
-        'min_hiragana_ratio': args.min_hiragana_ratio,
-        'max_hiragana_ratio': args.max_hiragana_ratio,
-        'min_kanji_ratio': args.min_kanji_ratio,
-        'max_kanji_ratio': args.max_kanji_ratio,
-    }
+    # 設定の作成（--presetが指定されている場合はJSONファイルから読み込む）
+    config = config_from_args(args)
     
     # クリーナーとパイプラインの作成
     cleaner = CorpusCleaner(config)
@@ -229,7 +43,15 @@ def main():
         use_llm=use_llm,
         llm_model_name=args.llm_model,
         max_llm_perplexity=args.max_llm_perplexity,
-        auto_detect_models=not args.no_auto_detect
+        auto_detect_models=not args.no_auto_detect,
+        llm_quantization=args.llm_quantization,
+        llm_cache_path=args.llm_cache,
+        llm_compile=args.llm_compile,
+        num_proc=args.num_proc,
+        staged=args.staged,
+        llm_batch_size=args.llm_batch_size,
+        kenlm_cache=not args.no_kenlm_cache,
+        keep_intermediates=args.keep_intermediates
     )
     
     print(f"入力ファイル: {args.input}")
@@ -0,0 +1,38 @@
+"""BloomFilterのテスト"""
+
+import random
+import unittest
+
+from corpus_cleaner.bloom import BloomFilter
+
+
+class BloomFilterTest(unittest.TestCase):
+    """偽陽性率と偽陰性"""
+
+    def test_false_positive_rate_after_growth(self):
+        """小さい初期容量から拡張しても、偽陽性率が設定値の近くに収まる"""
+        error_rate = 1e-4
+        rng = random.Random(0)
+        bloom = BloomFilter(100, error_rate)
+        keys = set()
+        while len(keys) < 3000:
+            key = rng.getrandbits(64)
+            keys.add(key)
+            bloom.add(key)
+
+        # 登録したキーは必ず含まれる
+        self.assertTrue(all(key in bloom for key in keys))
+
+        queries = 0
+        false_positives = 0
+        while queries < 300_000:
+            key = rng.getrandbits(64)
+            if key in keys:
+                continue
+            queries += 1
+            false_positives += key in bloom
+        self.assertLess(false_positives / queries, error_rate * 2.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
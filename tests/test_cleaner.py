@@ -0,0 +1,54 @@
+"""CorpusCleanerのテスト"""
+
+import time
+import unittest
+
+from corpus_cleaner.cleaner import CorpusCleaner
+
+
+class BrokenNotationTest(unittest.TestCase):
+    """崩れた表記の正規化"""
+
+    def test_table_border_is_linear(self):
+        """罫線文字2に挟まれた長い罫線の並びでも、バックトラックで遅くならない"""
+        for max_repeat_chars in (1, 2, 3, 5):
+            cleaner = CorpusCleaner({'max_repeat_chars': max_repeat_chars})
+            for length in (50, 10000):
+                text = '║' + '─' * length + '║'
+                start = time.perf_counter()
+                cleaner._normalize_text(text)
+                self.assertLess(time.perf_counter() - start, 1.0, (max_repeat_chars, length))
+
+    def test_table_border_matches_sequential_passes(self):
+        """罫線の並びを除去してから罫線文字2の並びを除去した場合と同じ結果になる"""
+        cleaner = CorpusCleaner({'max_repeat_chars': 3})
+        # 罫線の並びが除去されて罫線文字2が3つ以上つながる場合は、間の並びごと除去する
+        self.assertEqual(cleaner._normalize_broken_notation('a║───║───║b'), 'ab')
+        # 罫線文字2が2つしかつながらない場合は罫線文字2だけが残る
+        self.assertEqual(cleaner._normalize_broken_notation('a║' + '─' * 50 + '║b'), 'a║║b')
+
+
+class HtmlTextLengthTest(unittest.TestCase):
+    """HTMLのテキスト長の計算"""
+
+    def setUp(self):
+        self.cleaner = CorpusCleaner({})
+
+    def test_script_body_is_raw_text(self):
+        """scriptやstyleの中の<や>はタグとして扱わない"""
+        self.assertEqual(self.cleaner._html_text_length('<div>a<script>if (a<b) { x = "<p>"; }</script>b</div>'), 25)
+        self.assertEqual(self.cleaner._html_text_length('<div><style>p>q{}</style></div>'), 5)
+        # scriptの中の終了タグは対応する終了タグ以外では閉じない
+        self.assertEqual(self.cleaner._html_text_length('<p><script>a</p></script>b'), 6)
+
+    def test_script_text_counted_once(self):
+        """scriptの本文は祖先の要素では数えない"""
+        self.assertEqual(self.cleaner._html_text_length('<div><script>a</script></div>'), 1)
+
+    def test_textarea_body_is_text(self):
+        """textareaの中のタグは文字列として数える"""
+        self.assertEqual(self.cleaner._html_text_length('<textarea><b>x</b></textarea>'), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
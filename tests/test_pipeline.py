@@ -0,0 +1,27 @@
+"""パイプラインのJSONL入出力のテスト"""
+
+import json
+import unittest
+
+from corpus_cleaner.pipeline import _dump_entry, _load_entry
+
+
+class JSONLRoundTripTest(unittest.TestCase):
+    """JSONLの1行のデコードとエンコード"""
+
+    def test_non_finite_floats_are_preserved(self):
+        """NaN・Infinityはnullにならず、入力と同じ表記で書き出される"""
+        entry = _load_entry(b'{"content": "\\u3042", "score": NaN, "range": [-Infinity, Infinity], "note": null}\n')
+        dumped = _dump_entry(entry)
+        self.assertEqual(dumped, (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+        self.assertIn(b'NaN', dumped)
+        self.assertIn(b'-Infinity', dumped)
+
+    def test_null_without_non_finite_floats(self):
+        """nullだけを含む行はそのままnullとして書き出される"""
+        entry = _load_entry('{"content": "あ", "note": null}\n'.encode('utf-8'))
+        self.assertEqual(json.loads(_dump_entry(entry)), {'content': 'あ', 'note': None})
+
+
+if __name__ == '__main__':
+    unittest.main()